@@ -6,12 +6,15 @@
 # Implementation of the basic & advanced requirements in
 # Assignment of PRG1, 2023
 
-from typing import List, Dict
-
-from utils.carpark import associate_carpark_info, parse_carpark_information
-from utils.carpark import get_carpark_information
-from utils.files import load_file, write_file
+from utils.carpark import associate_carpark_info, load_carpark_availability
+from utils.carpark import get_carpark_information, get_carpark_locations, get_realtime_info
+from utils.commands import CommandRegistry
+from utils.diff import diff_snapshots
+from utils.export import EXPORT_FORMATS, SORT_KEYS, export_filename, export_snapshots
+from utils.history import format_timestamp, get_history, record_snapshot
 from utils.input import validate_input_str, validate_input_num
+from utils.scheduler import Poller
+from utils.table import CarparkTable
 
 
 def main_menu() -> int:
@@ -35,15 +38,18 @@ MENU
 [8]  Display All Carparks at Given Location
 [9]  Display Carpark with the Most Parking Lots
 [10] Create an Output File with Sorted Carpark Availability with Addresses
+[11] Display Top k Carparks by Total Lots, Lots Available or Percentage
+[12] Display Nearest Carparks to a Location With At Least x% or y Available Lots
+[13] Compare the Data Read in [3] With an Earlier File or Snapshot
 [0]  Exit"""
 
     print(display_str)
     choice = validate_input_num(
-        "Enter your option: ", list(range(1, 11)) + [0])
+        "Enter your option: ", list(range(1, 14)) + [0])
     return choice
 
 
-def option_1(carpark_info: List[Dict[str, str]], _: List[Dict[str, str]]) -> None:
+def option_1(carpark_info: CarparkTable, _: CarparkTable) -> None:
     """Function to display total number of carparks in carpark_info"""
     total_cps = len(carpark_info)
 
@@ -51,14 +57,15 @@ def option_1(carpark_info: List[Dict[str, str]], _: List[Dict[str, str]]) -> Non
     print("Total Number of carparks in 'carpark-information.csv': {}".format(total_cps))
 
 
-def option_2(carpark_info: List[Dict[str, str]], _: List[Dict[str, str]]) -> None:
+def option_2(carpark_info: CarparkTable, _: CarparkTable) -> None:
     """Function to display all basement carparks"""
     # Print option
     print("Option 2: Display All Basement Carparks in 'carpark-information.csv'")
 
     # Get basement carparks
-    basements = [cp for cp in carpark_info
-                 if cp["Carpark Type"] == "BASEMENT CAR PARK"]
+    basements = carpark_info.rows(
+        i for i, cp_type in enumerate(carpark_info.column("Carpark Type"))
+        if cp_type == "BASEMENT CAR PARK")
 
     # Loop and display them
     print("{:10} {:20} {}".format("Carpark No", "Carpark Type", "Address"))
@@ -66,7 +73,7 @@ def option_2(carpark_info: List[Dict[str, str]], _: List[Dict[str, str]]) -> Non
         # Extract neccessary info
         num = basement["Carpark Number"]
         cp_type = basement["Carpark Type"]
-        addr = basement["Address"].strip("\"")
+        addr = basement["Address"]
 
         # Print out info
         print("{:10} {:20} {}".format(num, cp_type, addr))
@@ -76,9 +83,9 @@ def option_2(carpark_info: List[Dict[str, str]], _: List[Dict[str, str]]) -> Non
 
 
 def option_3(
-        carpark_info: List[Dict[str, str]],
-        _: List[Dict[str, str]]
-) -> tuple[str, list[dict[str, str]]]:
+        carpark_info: CarparkTable,
+        _: CarparkTable
+) -> tuple[str, CarparkTable]:
     """Reads the user-specified file and loads the data to carpark_availability"""
     # Prints out option header
     print("Option 3: Read Carpark Availability Data File")
@@ -90,14 +97,11 @@ def option_3(
         "carpark-availability-v2.csv"
     )
 
-    # Get the carpark availability
-    cp_availability = load_file(filename)
-
-    # Get and set timestamp
-    timestamp = cp_availability.pop(0)
+    # Get the carpark availability and timestamp, and keep it in the history
+    timestamp, cp_availability = load_carpark_availability(filename)
+    record_snapshot(timestamp, cp_availability)
 
-    # Associate the carpark information & availability and get timestamp
-    cp_availability = parse_carpark_information(cp_availability)
+    # Associate the carpark information & availability
     all_cp_info = associate_carpark_info(cp_availability, carpark_info)
 
     # Prints out header
@@ -107,7 +111,7 @@ def option_3(
     return timestamp, all_cp_info
 
 
-def option_4(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None:
+def option_4(_: CarparkTable, all_cp_info: CarparkTable) -> None:
     """Function to print the total number of carparks in the file read"""
     # Print header
     print("Option 4: Print Total Number of Carparks in the File Read in [3]")
@@ -119,14 +123,15 @@ def option_4(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
     print("Total Number of Carparks in the File: {}".format(total))
 
 
-def option_5(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None:
+def option_5(_: CarparkTable, all_cp_info: CarparkTable) -> None:
     """Function to display all carparks that are full"""
     # Print header
     print("Option 5: Display Carparks without Available Lots")
 
     # Get carparks without lots
-    empty_cps = [
-        cp for cp in all_cp_info if cp["Lots Available"] == '0']
+    empty_cps = all_cp_info.rows(
+        i for i, lots in enumerate(all_cp_info.column("Lots Available"))
+        if lots == 0)
 
     # Loop through empty carparks and print their number
     for carpark in empty_cps:
@@ -136,7 +141,7 @@ def option_5(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
     print("Total number: {}".format(len(empty_cps)))
 
 
-def option_6(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None:
+def option_6(_: CarparkTable, all_cp_info: CarparkTable) -> None:
     """Function to display carparks with x% availability"""
     # Print header
     print("Option 6: Display Carparks With At Least x% Available Lots")
@@ -146,8 +151,8 @@ def option_6(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
         "Enter the percentage required: ", range(0, 101))
 
     # Get carparks that are above or equal to that percentage
-    cps_available = [
-        cp for cp in all_cp_info if cp["Percentage"] >= percentage]
+    cps_available = all_cp_info.rows(
+        all_cp_info.select({"Percentage": (percentage, None)}))
 
     # Loop through and display
     print("{:10} {:10} {:14} {:10}".format("Carpark No",
@@ -165,7 +170,7 @@ def option_6(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
     print("Total number: {}".format(len(cps_available)))
 
 
-def option_7(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None:
+def option_7(_: CarparkTable, all_cp_info: CarparkTable) -> None:
     """Function to display carparks with x% availability"""
     # Print header
     print("Option 7: Display Addresses of Carparks With At Least x% Available Lots")
@@ -175,8 +180,8 @@ def option_7(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
         "Enter the percentage required: ", range(0, 101))
 
     # Get carparks that are above or equal to that percentage
-    cps_available = [
-        cp for cp in all_cp_info if cp["Percentage"] >= percentage]
+    cps_available = all_cp_info.rows(
+        all_cp_info.select({"Percentage": (percentage, None)}))
 
     # Loop through and display
     print("{:10} {:10} {:14} {:10}   {}".format("Carpark No",
@@ -186,7 +191,7 @@ def option_7(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
         total = cp["Total Lots"]
         available = cp["Lots Available"]
         percentage = cp["Percentage"]
-        address = cp["Address"].strip("\"")
+        address = cp["Address"]
 
         print("{:10} {:>10} {:>14} {:10.1f}   {}".format(
             num, total, available, percentage, address))
@@ -195,7 +200,7 @@ def option_7(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
     print("Total number: {}".format(len(cps_available)))
 
 
-def option_8(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None:
+def option_8(_: CarparkTable, all_cp_info: CarparkTable) -> None:
     """Function to display all carparks at a given location"""
     print("Option 8: Display All Carparks at Given Location")
 
@@ -204,8 +209,8 @@ def option_8(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
     location = location.upper()
 
     # Filter carpark data by address
-    carparks_at_location = [
-        cp for cp in all_cp_info if location in cp["Address"]]
+    carparks_at_location = all_cp_info.rows(
+        all_cp_info.search("Address", location))
 
     # Display location not found if no carparks are found
     if len(carparks_at_location) == 0:
@@ -220,7 +225,7 @@ def option_8(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
         total = cp["Total Lots"]
         available = cp["Lots Available"]
         percentage = cp["Percentage"]
-        address = cp["Address"].strip("\"")
+        address = cp["Address"]
 
         print("{:10} {:>10} {:>14} {:10.1f}   {}".format(
             num, total, available, percentage, address))
@@ -229,15 +234,12 @@ def option_8(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
     print("Total number: {}".format(len(carparks_at_location)))
 
 
-def option_9(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None:
+def option_9(_: CarparkTable, all_cp_info: CarparkTable) -> None:
     """Function to display carparks with the most parking lots"""
     print("Option 9: Display carpark with the most parking lots")
 
     # Get the highest carpark
-    highest_cp = all_cp_info[0]
-    for cp in all_cp_info:
-        if int(cp["Total Lots"]) > int(highest_cp["Total Lots"]):
-            highest_cp = cp
+    highest_cp = all_cp_info[all_cp_info.top("Total Lots", 1)[0]]
 
     # Get the carpark information
     num = highest_cp["Carpark Number"]
@@ -252,9 +254,6 @@ def option_9(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
     if address == "":
         address = "No Address Found"
 
-    # Remove quotations from address
-    address = address.strip("\"")
-
     # Display carpark information
     print("Carpark Number: {}".format(num))
     print("Carpark Type: {}".format(cp_type))
@@ -265,46 +264,212 @@ def option_9(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]]) -> None
     print("Address: {}".format(address))
 
 
-def option_10(_: List[Dict[str, str]], all_cp_info: List[Dict[str, str]], timestamp: str) -> None:
+def option_10(_: CarparkTable, all_cp_info: CarparkTable, timestamp: str) -> None:
     """Function to create output file with sorted carpark info"""
-    # Sort by available lots
-    # Line taken from: https://stackoverflow.com/questions/72899/how-to-sort-a-list-of-dictionaries-by-a-value-of-the-dictionary-in-python
-    sorted_carpark = sorted(
-        all_cp_info, key=lambda cp: int(cp["Lots Available"]))
-
-    # Loop through sorted carparks and write to file
-    content = ""
-
-    # Write timestamp and headers
-    content += timestamp + '\n'
-    content += "Carpark Number,Total Lots,Lots Available,Address\n"
-
-    # Write the sorted data to the csv file
-    for cp in sorted_carpark:
-        data = [cp["Carpark Number"], cp["Total Lots"],
-                cp["Lots Available"], cp["Address"]]
-        content += ",".join(data)
-        content += '\n'
-
-    # Apply changes to the csv file
-    write_file("carpark-availability-with-addresses.csv", content)
-
-    # Display number of lines written
-    lines = len(sorted_carpark) + 2
+    # Get export format and sort key from user
+    fmt = validate_input_str(
+        "Enter the export format (csv, jsonl or bin): ", *EXPORT_FORMATS, ignore_case=True)
+    sort_key = validate_input_num(
+        "Sort by [1] Lots Available, [2] Total Lots or [3] Percentage: ", [1, 2, 3])
+
+    # Stream the sorted carparks to the file
+    fmt = fmt.lower()
+    rows = export_snapshots(
+        [(timestamp, all_cp_info)], fmt=fmt, sort_key=SORT_KEYS[int(sort_key) - 1])
+
+    # Display number of lines written, CSV files also have the timestamp and headers
+    lines = rows + 2 if fmt == "csv" else rows
     print("Lines written: {}".format(lines))
 
     # Display filename
-    print("Wrote to file: ./res/carpark-availability-with-addresses.csv")
+    print("Wrote to file: ./res/{}".format(export_filename(fmt)))
+
+
+def option_11(_: CarparkTable, all_cp_info: CarparkTable) -> None:
+    """Function to display the top k carparks ranked by a column"""
+    print("Option 11: Display Top k Carparks by Total Lots, Lots Available or Percentage")
+
+    # Get ranking from user
+    k = validate_input_num(
+        "Enter the number of carparks to display: ", range(1, len(all_cp_info) + 1))
+    column = validate_input_num(
+        "Rank by [1] Total Lots, [2] Lots Available or [3] Percentage: ", [1, 2, 3])
+    order = validate_input_str(
+        "Display the [H]ighest or [L]owest first: ", "H", "L", ignore_case=True)
 
+    # Get the ranked carparks
+    column = ["Total Lots", "Lots Available", "Percentage"][int(column) - 1]
+    ranked_cps = all_cp_info.rows(
+        all_cp_info.top(column, int(k), largest=order.upper() == "H"))
+
+    # Loop through and display
+    print("{:4} {:10} {:10} {:14} {:10}   {}".format("Rank", "Carpark No",
+                                                     "Total Lots", "Lots Available", "Percentage", "Address"))
+    for rank, cp in enumerate(ranked_cps, start=1):
+        num = cp["Carpark Number"]
+        total = cp["Total Lots"]
+        available = cp["Lots Available"]
+        percentage = cp["Percentage"]
+        address = cp["Address"]
 
-def main() -> None:
+        print("{:<4} {:10} {:>10} {:>14} {:10.1f}   {}".format(
+            rank, num, total, available, percentage, address))
+
+
+def option_12(carpark_info: CarparkTable, all_cp_info: CarparkTable) -> None:
+    """Function to display the nearest carparks to a location with enough available lots"""
+    print("Option 12: Display Nearest Carparks to a Location With At Least x% or y Available Lots")
+
+    # Carpark locations are only loaded once they are needed
+    if "Location" not in all_cp_info.headers:
+        associate_carpark_info(all_cp_info, carpark_info, locations=get_carpark_locations())
+
+    if all(location is None for location in all_cp_info.column("Location")):
+        print("No carpark locations found!")
+        return
+
+    # Get location and thresholds from user
+    latitude = validate_input_num("Enter the latitude: ", range(-90, 91))
+    longitude = validate_input_num("Enter the longitude: ", range(-180, 181))
+    k = validate_input_num(
+        "Enter the number of carparks to display: ", range(1, len(all_cp_info) + 1))
+    percentage = validate_input_num("Enter the minimum percentage: ", range(0, 101))
+    lots = validate_input_num("Enter the minimum number of available lots: ", range(0, 10 ** 6))
+
+    # Get the nearest carparks from the location index
+    nearest_cps = all_cp_info.nearest(
+        "Location", latitude, longitude, int(k),
+        {"Percentage": (percentage, None), "Lots Available": (lots, None)})
+
+    # Loop through and display
+    print("{:4} {:10} {:>13} {:14} {:10}   {}".format("Rank", "Carpark No",
+                                                     "Distance (km)", "Lots Available", "Percentage", "Address"))
+    for rank, (row, distance) in enumerate(nearest_cps, start=1):
+        cp = all_cp_info[row]
+        num = cp["Carpark Number"]
+        available = cp["Lots Available"]
+        percentage = cp["Percentage"]
+        address = cp["Address"]
+
+        print("{:<4} {:10} {:>13.2f} {:>14} {:10.1f}   {}".format(
+            rank, num, distance, available, percentage, address))
+
+    # Display length
+    print("Total number: {}".format(len(nearest_cps)))
+
+
+def option_13(carpark_info: CarparkTable, all_cp_info: CarparkTable, timestamp: str) -> None:
+    """Function to display the carparks added, removed and changed since an earlier snapshot"""
+    print("Option 13: Compare the Data Read in [3] With an Earlier File or Snapshot")
+
+    # Get the earlier snapshot from user
+    source = validate_input_str(
+        "Enter the file name, or 'previous' for the last snapshot before this one: ",
+        "carpark-availability-v1.csv",
+        "carpark-availability-v2.csv",
+        "previous"
+    )
+    if source == "previous":
+        try:
+            snapshot = get_history().before(timestamp)
+        except (OSError, ValueError):
+            snapshot = None
+
+        if snapshot is None:
+            print("No earlier snapshot found!")
+            return
+
+        time, old_cp_info = snapshot
+        old_timestamp = format_timestamp(time)
+    else:
+        old_timestamp, old_cp_info = load_carpark_availability(source)
+
+    k = validate_input_num("Enter the number of largest changes to display: ", range(1, len(all_cp_info) + 1))
+
+    # Compare the snapshots
+    diff = diff_snapshots(old_cp_info, all_cp_info)
+    print("From {}".format(old_timestamp))
+    print("To   {}".format(timestamp))
+
+    # Display the added and removed carparks
+    print("Carparks added: {}".format(len(diff.added)))
+    for row in diff.added:
+        print("{:10} {}".format(all_cp_info.column("Carpark Number")[row], all_cp_info.column("Address")[row]))
+
+    cp_info = carpark_info.index_by("Carpark Number")
+    print("Carparks removed: {}".format(len(diff.removed)))
+    for row in diff.removed:
+        num = old_cp_info.column("Carpark Number")[row]
+        info_row = cp_info.get(num)
+        print("{:10} {}".format(num, carpark_info.column("Address")[info_row] if info_row is not None else ""))
+
+    print("Carparks changed: {}".format(len(diff.changed)))
+    print("Carparks unchanged: {}".format(diff.unchanged))
+
+    # Loop through the largest changes and display
+    print("{:4} {:10} {:>6} {:>6} {:>7} {:>10}   {}".format(
+        "Rank", "Carpark No", "Before", "After", "Change", "Change (%)", "Address"))
+    for rank, change in enumerate(diff.movers(int(k)), start=1):
+        print("{:<4} {:10} {:>6} {:>6} {:>+7} {:>+10.1f}   {}".format(
+            rank, change.number, change.old_available, change.new_available,
+            change.available_change, change.percentage_change,
+            all_cp_info.column("Address")[change.row]))
+
+
+def register_commands(trace_memory: bool = False) -> CommandRegistry:
+    """Registers every menu option with a new command registry
+
+    Args:
+        trace_memory (bool): Whether to record the memory allocated by every option
+
+    Returns:
+        CommandRegistry: The registry containing options 1 to 13
+    """
+    registry = CommandRegistry(trace_memory=trace_memory)
+    for option, func in enumerate([
+        option_1, option_2, option_3, option_4, option_5,
+        option_6, option_7, option_8, option_9, option_10,
+        option_11, option_12, option_13
+    ], start=1):
+        registry.register(option, func)
+
+    return registry
+
+
+def main(show_timings: bool = False, live_interval: float | None = None) -> None:
+    """Runs the main menu loop
+
+    Args:
+        show_timings (bool): Whether to print a per-command timing and memory summary on exit
+        live_interval (float | None): Seconds between polls of realtime data,
+        None to only use the files read in option 3
+    """
     # Load carpark information
     cp_info = get_carpark_information()
     all_cp_info = None
     timestamp = None
 
+    # Register options, the loaded data is passed to them by reference
+    registry = register_commands(trace_memory=show_timings)
+
+    # Poll realtime data in the background if requested
+    poller = None
+    if live_interval is not None:
+        # Errors aren't printed, they would print over the menu prompt
+        poller = Poller(lambda: get_realtime_info(quiet=True), interval=live_interval,
+                        on_snapshot=record_snapshot,
+                        prepare=lambda _, table: associate_carpark_info(table, cp_info))
+        poller.start()
+
     # Mainloop
     while True:
+        # Switch to the newest realtime data, without waiting for it
+        if poller is not None:
+            snapshot = poller.take()
+            if snapshot is not None:
+                timestamp, all_cp_info = snapshot
+                print("Loaded realtime data, {}".format(timestamp))
+
         option = main_menu()  # Get option from user
         print()  # Padding
 
@@ -312,15 +477,23 @@ def main() -> None:
         if option == 0:
             break
 
-        # Check if option 3 has been ran for options 4..=7
+        # Check if option 3 has been ran for options 4..=13
         if option > 3 and all_cp_info is None:
             print("Please run option 3 first!")
             continue
 
         # Run specified option
-        if option != 3 and option != 10:
-            eval("option_{}({}, {})".format(option, cp_info, all_cp_info))
-        elif option == 10:
-            option_10(cp_info, all_cp_info, timestamp)
+        if option not in (3, 10, 13):
+            registry.run(option, cp_info, all_cp_info)
+        elif option in (10, 13):
+            registry.run(option, cp_info, all_cp_info, timestamp)
         else:
-            timestamp, all_cp_info = option_3(cp_info, all_cp_info)
+            timestamp, all_cp_info = registry.run(option, cp_info, all_cp_info)
+
+    # Stop polling
+    if poller is not None:
+        poller.stop()
+
+    # Display timing summary if requested
+    if show_timings:
+        print(registry.summary())
@@ -5,18 +5,23 @@
 # Implements additional requirements for PRG1 '23 Final Assignment
 # Interactive map with real time data
 
-import sys
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tkinter import messagebox
-from typing import Dict, List
+from typing import Callable, Dict, List, Tuple
 
 import tkintermapview as tk_map
-from PIL import Image, ImageTk, ImageDraw, ImageFont
 
-from utils.carpark import get_carpark_information, get_realtime_info
-from utils.carpark import parse_carpark_information, associate_carpark_info
-from utils.files import load_file, write_file
+from utils.carpark import get_carpark_information, get_carpark_locations, get_realtime_info
+from utils.carpark import load_carpark_availability, associate_carpark_info
+from utils.export import export_filename, export_snapshots
+from utils.history import record_snapshot
 from utils.input import validate_num
+from utils.loader import BackgroundLoader
+from utils.markers import ClusterLayer, MarkerSpec, fit_points
+from utils.popups import PopupCache, PopupInfo
+from utils.scheduler import POLL_INTERVAL, Poller
+from utils.table import CarparkRow, CarparkTable
 
 data_sources = [
     "carpark-availability-v1.csv",
@@ -26,6 +31,17 @@ data_sources = [
 
 chosen_data_source = data_sources[0]
 
+# Rendered marker popups, shared by every map
+popups = PopupCache()
+
+# Carparks shown from the right click menu of the map, and the fewest available lots they need
+NEAREST_COUNT = 5
+NEAREST_MIN_LOTS = 1
+
+# Seconds between polls of realtime data, and milliseconds between checks for new data
+poll_interval = POLL_INTERVAL
+UPDATE_CHECK_MS = 1000
+
 
 def prompt_choice(frame: tk.Frame):
     """Prompts the user to choose between the 2 CSV files
@@ -58,27 +74,13 @@ def prompt_choice(frame: tk.Frame):
 
 
 def show_map(frame: tk.Frame):
-    """Makes Tkinter show map with data based on the user selected source"""
+    """Makes Tkinter show map with data based on the user selected source,
+    the map is shown straight away and filled in once the data has loaded"""
     clear_frame(frame)
 
-    # Load carpark data
-    if chosen_data_source == data_sources[2]:
-        cp_availability = get_realtime_info()
-        timestamp = cp_availability.pop(0)
-    else:
-        cp_availability = load_file(chosen_data_source)
-        timestamp = cp_availability.pop(0)
-        cp_availability = parse_carpark_information(cp_availability)
-
-    # Handle failed request
-    if cp_availability is None:
-        messagebox.showerror("ERROR!", "Failed to get realtime data!")
-        sys.exit(1)
-
-    # Link carpark data
-    cp_info = get_carpark_information()
-    linked_info = associate_carpark_info(
-        cp_availability, cp_info, get_location=True)
+    # Data shown on the map, None until it has loaded
+    linked_info = None
+    timestamp = None
 
     # Initialise filter by percentage
     cp_percentage_label = tk.Label(frame, text="Filter by percentage: ")
@@ -94,26 +96,49 @@ def show_map(frame: tk.Frame):
     cp_location_label = tk.Label(frame, text="Filter by location: ")
     cp_location_label.place(x=250, y=0)
 
-    cp_location = tk.Entry(frame, width=40)
+    cp_location = tk.Entry(frame, width=20)
     cp_location.place(in_=cp_location_label, x=100)
 
+    # View of the data shown on the map, redrawn when realtime data updates,
+    # called with the data and whether to alert if no carparks were found
+    view = None
+
+    def show_view(new_view: Callable[[CarparkTable, bool], None]):
+        """Shows a view of the data, and keeps it for later updates"""
+        nonlocal view
+        view = new_view
+        view(linked_info, True)
+
+    def filter_view():
+        """Filters by the entries as they are when the Filter button is clicked"""
+        location, percentage = cp_location.get(), cp_percentage.get()
+        show_view(lambda data, alert: filter(map_widget, data, location, percentage, alert))
+
     # Filter button
-    filter_btn = tk.Button(frame, text="Filter",
-                           command=lambda: filter(
-                               map_widget, linked_info,
-                               cp_location, cp_percentage
-                           ))
-    filter_btn.place(x=640, y=0, anchor="ne")
+    filter_btn = tk.Button(frame, text="Filter", command=filter_view)
+    filter_btn.place(x=525, y=0, anchor="ne")
 
     # Export button
     export_btn = tk.Button(frame, text="Export",
                            command=lambda: export_data(linked_info, timestamp))
-    export_btn.place(x=690, y=0, anchor="ne")
+    export_btn.place(x=580, y=0, anchor="ne")
 
     # Show most lots button
     most_lots_btn = tk.Button(
-        frame, text="Most Lots", command=lambda: most_lots(map_widget, linked_info))
-    most_lots_btn.place(x=760, y=0, anchor="ne")
+        frame, text="Most Lots",
+        command=lambda: show_view(lambda data, alert: most_lots(map_widget, data, alert)))
+    most_lots_btn.place(x=655, y=0, anchor="ne")
+
+    # Show top 10 emptiest carparks button
+    emptiest_btn = tk.Button(
+        frame, text="Top 10 Emptiest",
+        command=lambda: show_view(lambda data, alert: emptiest(map_widget, data, alert=alert)))
+    emptiest_btn.place(x=765, y=0, anchor="ne")
+
+    # The buttons need the data, so they are enabled once it has loaded
+    data_buttons = [filter_btn, export_btn, most_lots_btn, emptiest_btn]
+    for button in data_buttons:
+        button.config(state=tk.DISABLED)
 
     # Initialise map
     map_widget = tk_map.TkinterMapView(frame, width=800, height=570)
@@ -123,73 +148,247 @@ def show_map(frame: tk.Frame):
     map_widget.set_position(1.290270, 103.851959)
     map_widget.set_zoom(11)
 
-    # Load data to map
-    draw_markers(map_widget, linked_info)
+    # Show the nearest carparks to a point from the right click menu, once loaded,
+    # so ordinary clicks and drags leave the view alone
+    def show_nearest(coords: Tuple[float, float]):
+        nonlocal view
+        if linked_info is None:
+            return
+
+        percentage = cp_percentage.get()
+        nearest(map_widget, linked_info, percentage, coords)
+
+        # Only zoom to the carparks when asked, not when the data updates
+        view = lambda data, alert: nearest(map_widget, data, percentage, coords, alert=alert, fit=False)
+
+    map_widget.add_right_click_menu_command(
+        label="Show nearest carparks here", command=show_nearest, pass_coords=True)
+
+    # Loading state over the bottom of the map, with a button to go back
+    status_label = tk.Label(frame, text="Loading carpark data...")
+    status_label.place(x=5, y=595, anchor="sw")
+
+    cancel_btn = tk.Button(frame, text="Cancel", command=lambda: cancel())
+    cancel_btn.place(x=795, y=595, anchor="se")
+
+    def cancel():
+        """Stops loading and goes back to choosing the data source"""
+        loader.cancel()
+        prompt_choice(frame)
+
+    def show_error(message: str):
+        """Shows why loading failed, and lets the user go back"""
+        status_label.config(text=message, fg="red")
+        cancel_btn.config(text="Back")
+
+    def show_data(result: Tuple[str, CarparkTable] | None):
+        """Fills in the map once the data has loaded"""
+        nonlocal linked_info, timestamp
+
+        # Handle failed request
+        if result is None:
+            show_error("Failed to get realtime data!")
+            return
+
+        timestamp, linked_info = result
+        for button in data_buttons:
+            button.config(state=tk.NORMAL)
+        status_label.destroy()
+        cancel_btn.destroy()
+
+        # Load data to map
+        show_view(lambda data, alert: draw_markers(map_widget, data, alert))
+
+        # Keep realtime data current by polling in the background
+        if chosen_data_source == data_sources[2]:
+            poll_for_updates()
+
+    def poll_for_updates():
+        """Polls realtime data in the background, and redraws the current
+        view with new snapshots"""
+        poller = Poller(lambda: get_realtime_info(quiet=True),
+                        interval=poll_interval, on_snapshot=record_snapshot,
+                        prepare=lambda _, table: associate_carpark_info(
+                            table, get_carpark_information(), get_location=True))
+        poller.last_timestamp = timestamp
+        poller.start(immediate=False)
+
+        def check_for_update():
+            """Redraws the current view with the newest snapshot, without blocking"""
+            nonlocal linked_info, timestamp
+
+            # Stop polling once the map has been closed
+            if not map_widget.winfo_exists():
+                poller.stop()
+                return
+
+            snapshot = poller.take()
+            if snapshot is not None:
+                timestamp, linked_info = snapshot
+                view(linked_info, False)
+
+            frame.after(UPDATE_CHECK_MS, check_for_update)
+
+        frame.after(UPDATE_CHECK_MS, check_for_update)
+
+    # Load the data on a worker thread, reporting progress to the status label
+    loader = BackgroundLoader(
+        frame, lambda report: load_map_data(chosen_data_source, report),
+        on_progress=lambda message: status_label.config(text=message),
+        on_done=show_data,
+        on_error=lambda e: show_error("Failed to load carpark data: {}".format(e))
+    )
+    loader.start()
+
+
+def load_map_data(
+        source: str,
+        report: Callable[[str], None]
+) -> Tuple[str, CarparkTable] | None:
+    """Loads and links the data shown on the map, run on a worker thread
+
+    The availability, locations and carpark information are loaded at the
+    same time, so loading takes as long as the slowest of them.
+
+    Args:
+        source (str): One of `data_sources`
+        report (Callable[[str], None]): Reports progress, raises LoadCancelled
+        once loading has been cancelled
+
+    Returns:
+        Tuple[str, CarparkTable] | None: The timestamp and linked carpark data,
+        None if realtime data could not be retrieved
+    """
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = {
+            pool.submit(load_data_source, source): "carpark availability",
+            pool.submit(get_carpark_locations): "carpark locations",
+            pool.submit(get_carpark_information): "carpark information",
+        }
+
+        # Report each source as it arrives
+        report("Loading carpark data...")
+        for loaded, future in enumerate(as_completed(futures), start=1):
+            report("Loaded {} ({}/{})...".format(futures[future], loaded, len(futures)))
+
+    results = {name: future.result() for future, name in futures.items()}
+
+    # Handle failed request
+    availability = results["carpark availability"]
+    if availability is None:
+        return None
+
+    # Keep the snapshot in the history and link carpark data
+    report("Linking carpark data...")
+    timestamp, cp_availability = availability
+    record_snapshot(timestamp, cp_availability)
+    linked_info = associate_carpark_info(
+        cp_availability, results["carpark information"],
+        locations=results["carpark locations"])
+
+    return timestamp, linked_info
+
+
+def load_data_source(source: str) -> Tuple[str, CarparkTable] | None:
+    """Loads the carpark availability from the chosen data source
+
+    Args:
+        source (str): One of `data_sources`
+
+    Returns:
+        Tuple[str, CarparkTable] | None: The timestamp and carpark availability,
+        None if realtime data could not be retrieved
+    """
+    if source == data_sources[2]:
+        return get_realtime_info()
+
+    return load_carpark_availability(source)
+
+
+def get_marker_layer(map_widget: tk_map.TkinterMapView) -> ClusterLayer:
+    """Gets the marker layer of a map, creating it on first use
+
+    The layer is kept on the map itself, as it refers back to the map, so both
+    are freed together once the map is destroyed.
+
+    Args:
+        map_widget (tk_map.TkinterMapView): The map
+
+    Returns:
+        ClusterLayer: The layer holding the map's carpark markers
+    """
+    layer = getattr(map_widget, "marker_layer", None)
+    if layer is None:
+        layer = map_widget.marker_layer = ClusterLayer(
+            map_widget, make_spec=carpark_marker, command=marker_click,
+            on_update=lambda specs: prerender_popups(map_widget, specs))
+    return layer
+
 
+def prerender_popups(map_widget: tk_map.TkinterMapView, specs: Dict[str, MarkerSpec]):
+    """Renders the popups of the visible carpark markers while the map is idle,
+    so clicking them shows the popup straight away
 
-def draw_markers(map_widget: tk_map.TkinterMapView, data: List[Dict[str, str]]):
+    Args:
+        map_widget (tk_map.TkinterMapView): The map
+        specs (Dict[str, MarkerSpec]): The markers on the map
+    """
+    popups.prerender(map_widget, (spec.data for spec in specs.values()
+                                  if isinstance(spec.data, PopupInfo)))
+
+
+def carpark_marker(carpark: CarparkRow) -> MarkerSpec:
+    """Makes the marker of a located carpark, its popup is only rendered once clicked
+
+    Args:
+        carpark (CarparkRow): The carpark, with a Location
+
+    Returns:
+        MarkerSpec: The carpark's marker
+    """
+
+    # Location is already parsed into lat & long
+    latitude, longitude = carpark["Location"]
+
+    # Marker colour depends on the availability bucket, computed when the data was linked
+    return MarkerSpec(
+        latitude, longitude,
+        carpark["Carpark Number"],
+        carpark["Availability Bucket"],
+        PopupInfo.from_carpark(carpark)
+    )
+
+
+def draw_markers(map_widget: tk_map.TkinterMapView, data: List[CarparkRow], alert: bool = True):
     """Function to draw a marker on a Tkinter MapView, using the given carpark data
-    formatted in a dict.
+    formatted in a dict. Nearby carparks are clustered by zoom level, and only
+    markers inside the viewport are drawn.
 
     Args:
         map_widget (tk_map.TkinterMapView): The map to draw the marker on
-        data (ListDict[str, str]]): The list of carpark data
+        data (List[CarparkRow]): The list of carpark data
+        alert (bool): Whether to alert the user if no carparks were found
     """
 
-    # Clear map markers
-    map_widget.delete_all_marker()
-
-    # Loop through list and draw
-    for carpark in data:
-        # Parse location data and skip if none
-        location = carpark.get("Location")
-        if location is None:
-            continue
-
-        # Format data into lat & long
-        latitude, longitude = location.split(" ")
-        latitude, longitude = float(latitude), float(longitude)
-
-        # Get availability percentage and set marker color
-        percentage = carpark["Percentage"]
-        if percentage > 75:
-            # Green
-            inner_color = "#00FF00"
-            outer_color = "#006400"
-        elif percentage > 25:
-            # Yellow
-            inner_color = "#FFFF00"
-            outer_color = "#FFA500"
-        else:
-            # Red
-            inner_color = "#FF0000"
-            outer_color = "#8B0000"
-
-        # Generate data to show on image
-        display_text = ""
-        display_text += carpark["Carpark Number"] + '\n'
-        display_text += "Available Lots: " + carpark["Lots Available"] + '\n'
-        display_text += "Total Lots: " + carpark["Total Lots"] + '\n'
-        display_text += "Percentage: " + \
-                        str(round(carpark["Percentage"], 2)) + "%\n"
-        display_text += "Address: " + carpark["Address"].strip("\"")
-
-        # Display marker
-        map_widget.set_marker(
-            latitude, longitude,
-            text=carpark["Carpark Number"],
-            marker_color_circle=inner_color,
-            marker_color_outside=outer_color,
-            data=display_text,
-            command=marker_click
-        )
+    # Show the carparks, skipping those without a location
+    get_marker_layer(map_widget).show(data)
 
     # Alert user if no carparks were found
-    if len(data) == 0:
+    if len(data) == 0 and alert:
         messagebox.showerror("Error!", "No Carparks Found!")
 
 
-def main():
+def main(live_interval: float | None = None):
+    """Runs the map window
+
+    Args:
+        live_interval (float | None): Seconds between polls of realtime data,
+        None for the default
+    """
+    global poll_interval
+    if live_interval is not None:
+        poll_interval = live_interval
+
     # Create tkinter window
     root = tk.Tk()
     root.geometry("800x600")
@@ -225,115 +424,143 @@ def clear_frame(frame: tk.Frame):
 
 def filter(
         map_widget: tk_map.TkinterMapView,
-        data: List[Dict[str, str]],
-        location: tk.Entry,
-        percentage: tk.Entry
+        data: CarparkTable,
+        location: str,
+        percentage: str,
+        alert: bool = True
 ):
     """Filters the data based on the user input
 
     Args:
         map_widget (tk_map.TkinterMapView): The map view
-        data (List[Dict[str, str]]): The list of carpark data
-        location (tk.Entry): The location tkinter entry
-        percentage (tk.Entry): The percentage tkinter entry
+        data (CarparkTable): The carpark data
+        location (str): Text of the location entry
+        percentage (str): Text of the percentage entry
+        alert (bool): Whether to alert the user if no carparks were found
     """
 
-    # Get location & percentage data and format them
-    location = location.get()
+    # Format the location & percentage
     location = location.upper()
 
-    percentage = percentage.get()
     if percentage == "":
         percentage = "0.0"
 
-    # Generate a list of valid carparks
-    valid_cps = [cp for cp in data if (
-            location == "" or location in cp["Address"]
-    ) and (
-            cp["Percentage"] >= float(percentage)
-    )]
+    # Generate a list of valid carparks, from the location matches
+    # and the percentage index
+    candidates = None
+    if location != "":
+        candidates = data.search("Address", location)
+
+    valid_cps = data.rows(data.select(
+        {"Percentage": (float(percentage), None)}, rows=candidates))
 
     # Show map data with valid carparks
-    draw_markers(map_widget, valid_cps)
+    draw_markers(map_widget, valid_cps, alert=alert)
 
 
-def most_lots(map_widget: tk_map.TkinterMapView, data: List[Dict[str, str]]):
+def most_lots(map_widget: tk_map.TkinterMapView, data: CarparkTable, alert: bool = True):
     """Finds the carpark with the most number of lots and displays it
 
     Args:
         map_widget (tk_map.TkinterMapView): The tkinter map view
-        data (List[Dict[str, str]]): The carpark data
+        data (CarparkTable): The carpark data
+        alert (bool): Whether to alert the user if no carparks were found
     """
 
-    # Loop through data and find max carpark
-    highest_carpark = data[0]
-    for carpark in data:
-        # Ignore blank location
-        if carpark["Location"] is None:
-            continue
-
-        # Compare and overwrite if highest
-        if int(carpark["Total Lots"]) > int(highest_carpark["Total Lots"]):
-            highest_carpark = carpark
+    # Find the located carpark with the most lots
+    locations = data.column("Location")
+    highest_carpark = data.top(
+        "Total Lots", 1, where=lambda i: locations[i] is not None)
 
     # Draw marker for highest carpark
-    draw_markers(map_widget, [highest_carpark])
+    draw_markers(map_widget, data.rows(highest_carpark), alert=alert)
 
 
-def export_data(data: List[Dict[str, str]], timestamp: str):
-    """Exports the data into a csv file
+def emptiest(map_widget: tk_map.TkinterMapView, data: CarparkTable, k: int = 10, alert: bool = True):
+    """Finds the located carparks with the highest percentage of available lots
+    and displays them
 
     Args:
-        data (List[Dict[str, str]]): The data to export
-        timestamp (str): The timestamp to write to the file
+        map_widget (tk_map.TkinterMapView): The tkinter map view
+        data (CarparkTable): The carpark data
+        k (int): Number of carparks to display
+        alert (bool): Whether to alert the user if no carparks were found
+    """
+
+    # Rank located carparks by percentage
+    locations = data.column("Location")
+    emptiest_carparks = data.top(
+        "Percentage", k, where=lambda i: locations[i] is not None)
+
+    # Draw markers for the emptiest carparks
+    draw_markers(map_widget, data.rows(emptiest_carparks), alert=alert)
+
+
+def nearest(
+        map_widget: tk_map.TkinterMapView,
+        data: CarparkTable,
+        percentage: str,
+        coords: Tuple[float, float],
+        k: int = NEAREST_COUNT,
+        alert: bool = True,
+        fit: bool = True
+):
+    """Finds the carparks nearest to a point with at least the percentage
+    filter and NEAREST_MIN_LOTS available, and displays them
+
+    Args:
+        map_widget (tk_map.TkinterMapView): The tkinter map view
+        data (CarparkTable): The carpark data
+        percentage (str): Text of the percentage entry
+        coords (Tuple[float, float]): Latitude and longitude of the point
+        k (int): Number of carparks to display
+        alert (bool): Whether to alert the user if no carparks were found
+        fit (bool): Whether to zoom the map to the point and the carparks
     """
 
-    # Sort by available lots
-    sorted_carpark = sorted(data, key=lambda cp: int(cp["Lots Available"]))
+    if percentage == "":
+        percentage = "0.0"
+
+    # Search the location index from the point
+    nearest_cps = data.nearest(
+        "Location", *coords, k,
+        {"Percentage": (float(percentage), None), "Lots Available": (NEAREST_MIN_LOTS, None)})
+
+    # Zoom to fit the point and the nearest carparks, so they aren't clustered
+    nearest_cps = data.rows(row for row, _ in nearest_cps)
+    if fit:
+        fit_points(map_widget, [coords] + [cp["Location"] for cp in nearest_cps])
 
-    # Loop through sorted carparks and write to file
-    content = ""
+    # Draw markers for the nearest carparks
+    draw_markers(map_widget, nearest_cps, alert=alert)
 
-    # Write timestamp and headers
-    content += timestamp + '\n'
-    content += "Carpark Number,Total Lots,Lots Available,Address\n"
 
-    # Write the sorted data to the csv file
-    for cp in sorted_carpark:
-        data = [cp["Carpark Number"], cp["Total Lots"],
-                cp["Lots Available"], cp["Address"]]
-        content += ",".join(data)
-        content += '\n'
+def export_data(data: CarparkTable, timestamp: str):
+    """Exports the data into a csv file
+
+    Args:
+        data (CarparkTable): The data to export
+        timestamp (str): The timestamp to write to the file
+    """
 
-    # Apply changes to the csv file
-    write_file("carpark-availability-with-addresses.csv", content)
+    # Stream the data sorted by available lots to the csv file
+    rows = export_snapshots([(timestamp, data)])
 
     # Alert the user the file has been written
-    lines = len(sorted_carpark) + 2
+    lines = rows + 2
     messagebox.showinfo(
-        "Success!", "Wrote {} lines to: ./res/carpark-availability-with-addresses.csv!"
-        .format(lines)
+        "Success!", "Wrote {} lines to: ./res/{}!"
+        .format(lines, export_filename("csv"))
     )
 
 
 def marker_click(marker):
-    """Function to generate an image to display carpark data,
-    and toggles visibility if the image has been generated"""
+    """Function to show an image of the carpark data,
+    and toggles visibility if the image has been shown"""
 
     if marker.image is None:
-        # Retrieve text to display
-        display_text = marker.data
-
-        # Generate image
-        # Credits: https://stackoverflow.com/questions/63280719/tkinter-how-to-change-text-into-an-image
-        image = Image.new("RGB", (300, 75), (255, 255, 255))
-        draw = ImageDraw.Draw(image)
-        font = ImageFont.truetype("arial.ttf", size=12)
-        draw.text((0, 0), font=font, text=display_text, fill="black")
-        final_image = ImageTk.PhotoImage(image)
-
-        # Set image
-        marker.image = final_image
+        # Get the rendered image, rendering it if needed
+        marker.image = popups.get(marker.data)
         marker.image_hidden = True
 
     # Toggle image visibility
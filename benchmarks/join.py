@@ -0,0 +1,96 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# join.py
+# Benchmarks joining availability with the carpark information and computing
+# the derived columns, in pure Python against NumPy, on carpark-availability-v1.csv
+# repeated a number of times
+#
+# Usage (from the directory containing main.py):
+#   python benchmarks/join.py [repeats] [runs]
+
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, ".")
+
+from utils.carpark import associate_carpark_info, get_carpark_information  # noqa: E402
+from utils.carpark import load_carpark_availability  # noqa: E402
+from utils.table import CarparkTable  # noqa: E402
+from utils.vectorized import availability_buckets, join_rows, load_numpy, percentages, take  # noqa: E402
+
+SOURCE_FILE = "carpark-availability-v1.csv"
+
+# Columns joined from the carpark information
+JOINED_COLUMNS = ["Carpark Type", "Type of Parking System", "Address"]
+
+
+def join(available_cps: CarparkTable, carpark_info: CarparkTable, vectorize: bool) -> Tuple:
+    """Joins the columns and computes the percentages and buckets, without building indexes"""
+    rows = join_rows(available_cps.column("Carpark Number"), carpark_info.index_by("Carpark Number"), vectorize)
+    joined = [take(carpark_info.column(name), rows, "", vectorize) for name in JOINED_COLUMNS]
+    percentage = percentages(available_cps.column("Lots Available"),
+                             available_cps.column("Total Lots"), vectorize)
+    return joined, percentage, availability_buckets(percentage, vectorize)
+
+
+def best_time(function, runs: int) -> float:
+    """Runs a function a number of times and returns the fastest run in seconds"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def benchmark(repeats: int, runs: int) -> List[Tuple[str, float]]:
+    """Times the join with each engine, checking they give the same result
+
+    Args:
+        repeats (int): Times the rows of the availability file are repeated
+        runs (int): Runs per engine, the fastest is kept
+
+    Returns:
+        List[Tuple[str, float]]: Name and best time in seconds of every step
+    """
+    carpark_info = get_carpark_information()
+    columns = load_carpark_availability(SOURCE_FILE)[1].to_columns()
+    available_cps = CarparkTable.from_columns({name: list(column) * repeats for name, column in columns.items()})
+
+    engines = [("python", False)]
+    if load_numpy() is not None:
+        engines.append(("numpy", True))
+
+    results = []
+    expected = join(available_cps, carpark_info, False)
+    for name, vectorize in engines:
+        if join(available_cps, carpark_info, vectorize) != expected:
+            raise AssertionError("{} gave a different result".format(name))
+        results.append(("join, " + name, best_time(lambda: join(available_cps, carpark_info, vectorize), runs)))
+
+    # Everything associate_carpark_info does, including building the indexes
+    results.append(("associate_carpark_info", best_time(
+        lambda: associate_carpark_info(CarparkTable.from_columns(available_cps.to_columns()), carpark_info), runs)))
+
+    return results
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    if load_numpy() is None:
+        print("NumPy is not installed, only timing the pure Python engine")
+
+    results = benchmark(repeats, runs)
+    print("{:24} {:>10}".format("Step", "Time (ms)"))
+    for name, elapsed in results:
+        print("{:24} {:>10.1f}".format(name, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
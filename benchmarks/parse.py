@@ -0,0 +1,107 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# parse.py
+# Benchmarks parsing one large availability file with the streaming parser
+# against the chunked parallel parser, using a file made by repeating the
+# rows of carpark-availability-v1.csv
+#
+# Usage (from the directory containing main.py):
+#   python benchmarks/parse.py [rows] [runs]
+
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, ".")
+
+from utils.carpark import load_carpark_availability  # noqa: E402
+from utils.files import resource_path  # noqa: E402
+from utils.ingest import parse_large_file  # noqa: E402
+
+SOURCE_FILE = "carpark-availability-v1.csv"
+
+
+def make_large_file(rows: int) -> str:
+    """Writes an availability file with the given number of rows to a temporary file
+
+    Args:
+        rows (int): Number of carpark rows to write
+
+    Returns:
+        str: Absolute path to the file, delete it when done
+    """
+    with open(resource_path(SOURCE_FILE)) as f:
+        timestamp, headers, *lines = f.read().splitlines()
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    with os.fdopen(fd, "w") as f:
+        f.write(timestamp + "\n" + headers + "\n")
+        for i in range(rows):
+            f.write(lines[i % len(lines)] + "\n")
+
+    return path
+
+
+def best_time(parse: Callable[[], Tuple], runs: int) -> float:
+    """Runs a parser a number of times and returns the fastest run in seconds"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def benchmark(path: str, runs: int) -> List[Tuple[str, float]]:
+    """Times every parser on a file, checking they give the same result
+
+    Args:
+        path (str): The file to parse
+        runs (int): Runs per parser, the fastest is kept
+
+    Returns:
+        List[Tuple[str, float]]: Name and best time in seconds of every parser
+    """
+    expected = load_carpark_availability(path)[1].to_columns()
+
+    parsers = [("streaming (current)", lambda: load_carpark_availability(path))]
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        parsers.append(("chunked, {} worker{}".format(workers, "s" * (workers > 1)),
+                        lambda workers=workers: parse_large_file(path, max_workers=workers)))
+        workers *= 2
+
+    results = []
+    for name, parse in parsers:
+        if parse()[1].to_columns() != expected:
+            raise AssertionError("{} gave a different result".format(name))
+        results.append((name, best_time(parse, runs)))
+
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    path = make_large_file(rows)
+    try:
+        print("Parsing {:,} rows ({:.1f} MB), best of {}".format(
+            rows, os.path.getsize(path) / 1e6, runs))
+        results = benchmark(path, runs)
+    finally:
+        os.remove(path)
+
+    baseline = results[0][1]
+    print("{:22} {:>10} {:>9}".format("Parser", "Time (s)", "Speedup"))
+    for name, elapsed in results:
+        print("{:22} {:>10.3f} {:>8.2f}x".format(name, elapsed, baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# startup.py
+# Benchmarks the import cost of each mode using `python -X importtime`
+#
+# Usage (from the directory containing main.py):
+#   python benchmarks/startup.py [runs]
+
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Module imported by each mode
+MODES = {
+    "entry": "main",
+    "normal": "S10255800_Assignment",
+    "additional": "S10255800_Assignment_Extra",
+}
+
+# Modules that should only be loaded by the additional mode
+HEAVY_MODULES = ["tkinter", "tkintermapview", "PIL", "requests", "dotenv", "numpy"]
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """Imports a module in a new interpreter and reads its import times
+
+    Args:
+        module (str): The module to import
+
+    Returns:
+        Dict[str, int]: Cumulative import time in microseconds, keyed by module name
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        capture_output=True, text=True, check=True
+    )
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def benchmark(runs: int) -> List[Tuple[str, int, List[str]]]:
+    """Measures the best import time of every mode over a number of runs
+
+    Args:
+        runs (int): Number of interpreters to start per mode
+
+    Returns:
+        List[Tuple[str, int, List[str]]]: Mode, best import time in microseconds
+        and the heavy modules it loaded
+    """
+    results = []
+    for mode, module in MODES.items():
+        best = None
+        for _ in range(runs):
+            times = import_times(module)
+            if best is None or times[module] < best[module]:
+                best = times
+
+        heavy = [name for name in HEAVY_MODULES if name in best]
+        results.append((mode, best[module], heavy))
+
+    return results
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print("{:12} {:>12}   {}".format("Mode", "Import (ms)", "Heavy modules loaded"))
+    for mode, elapsed, heavy in benchmark(runs):
+        print("{:12} {:>12.1f}   {}".format(mode, elapsed / 1000, ", ".join(heavy) or "-"))
+
+
+if __name__ == "__main__":
+    main()
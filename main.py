@@ -6,8 +6,10 @@
 # In charge of getting the user input to switch between normal and additional mode
 # Before running the respective scripts
 
-from S10255800_Assignment_Extra import main as additional_main
-from S10255800_Assignment import main as normal_main
+import argparse
+import contextlib
+import sys
+
 from utils.input import validate_input_str
 
 title = r"""
@@ -22,7 +24,77 @@ title = r"""
 """
 
 
+def build_parser() -> argparse.ArgumentParser:
+    """Builds the parser of the command line options
+
+    Returns:
+        argparse.ArgumentParser: The parser
+    """
+    parser = argparse.ArgumentParser(description="PRG1 Assignment, carpark availability")
+    parser.add_argument("--timings", action="store_true",
+                        help="print a per-command timing and memory summary on exit (normal mode)")
+    parser.add_argument("--live", action="store_true",
+                        help="poll realtime data in the background")
+    parser.add_argument("--interval", type=float, default=60.0,
+                        help="seconds between realtime polls (default: 60)")
+
+    # Batch mode, runs queries without the menu
+    batch = parser.add_argument_group(
+        "batch mode", "run queries without prompting and print JSON lines, e.g. "
+        "main.py -f carpark-availability-v1.csv -q count percentage:50 \"location:ang mo kio\"")
+    batch.add_argument("-f", "--file", dest="files", action="extend", nargs="+", default=[],
+                       metavar="FILE", help="availability files, by name in ./res or by path")
+    batch.add_argument("-q", "--query", dest="queries", action="extend", nargs="+", default=[],
+                       metavar="QUERY", help="queries to run against every file, "
+                       "see utils/batch.py for the list")
+    batch.add_argument("--queries", dest="queries_file", type=argparse.FileType("r"),
+                       metavar="FILE", help="read queries from a file, one per line, - for stdin")
+    batch.add_argument("--workers", type=int, metavar="N",
+                       help="most processes parsing files (default: one per core)")
+    batch.add_argument("-o", "--output", type=argparse.FileType("w"), default=sys.stdout,
+                       metavar="FILE", help="write the results to a file instead of stdout")
+    return parser
+
+
+def run_batch_mode(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Runs the queries given on the command line, exiting on invalid queries"""
+    from utils.batch import parse_query, run_batch
+
+    texts = list(args.queries)
+    if args.queries_file is not None:
+        texts += [line for line in args.queries_file.read().splitlines() if line.strip()]
+
+    # Check every query before loading any data
+    try:
+        queries = [parse_query(text) for text in texts]
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Keep stdout for the results, messages from loading go to stderr
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            run_batch(args.files, queries, args.output, workers=args.workers)
+    except (OSError, ValueError) as e:
+        parser.exit(1, "Error: {}\n".format(e))
+    finally:
+        args.output.flush()
+
+
 def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    live_interval = args.interval if args.live else None
+
+    # Skip the menu when queries are given
+    if args.queries or args.queries_file is not None:
+        run_batch_mode(parser, args)
+        return
+
+    # The other batch options mean nothing to the menu, so don't silently ignore them
+    if args.files or args.workers is not None or args.output is not sys.stdout:
+        parser.error("-f/--file, --workers and -o/--output need queries to run, "
+                     "given with -q/--query or --queries")
+
     print(title)
     print("=============================================")
     print("Hi, welcome to my PRG1 Assignment.")
@@ -31,10 +103,13 @@ def main():
 
     choice = validate_input_str("> ", "N", "A", ignore_case=True)
 
+    # Only import the chosen mode, so normal mode never loads the GUI libraries
     if choice.upper() == "N":
-        normal_main()
+        from S10255800_Assignment import main as normal_main
+        normal_main(show_timings=args.timings, live_interval=live_interval)
     else:
-        additional_main()
+        from S10255800_Assignment_Extra import main as additional_main
+        additional_main(live_interval=live_interval)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,19 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# conftest.py
+# Runs every test from the directory containing main.py, as files in ./res
+# are looked up relative to it
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def in_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,33 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# test_commands.py
+# Checks command timings leave out the time spent waiting on prompts
+
+import builtins
+import time
+
+from utils.commands import CommandRegistry
+
+
+def slow_input(prompt: str = "") -> str:
+    """Stands in for a user taking a while to answer"""
+    time.sleep(0.2)
+    return "1"
+
+
+def test_input_is_timed_separately(monkeypatch):
+    monkeypatch.setattr(builtins, "input", slow_input)
+
+    def option_1():
+        return int(input("First: ")) + int(input("Second: "))
+
+    registry = CommandRegistry()
+    registry.register(1, option_1)
+    assert registry.run(1) == 2
+
+    (elapsed, waiting, _, _), = registry.timings[1]
+    assert elapsed < 0.1
+    assert waiting >= 0.4
+    assert builtins.input is slow_input
+    assert "Input (ms)" in registry.summary()
@@ -0,0 +1,44 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# test_export.py
+# Checks the binary columnar export is little-endian and reads back unchanged
+
+import struct
+
+from utils.carpark import associate_carpark_info, get_carpark_information, load_carpark_availability
+from utils.export import BLOCK_MAGIC, export_snapshots, load_columnar
+
+
+def test_columnar_round_trip(tmp_path):
+    timestamp, table = load_carpark_availability("carpark-availability-v1.csv")
+    table = associate_carpark_info(table, get_carpark_information())
+    path = str(tmp_path / "export.bin")
+
+    assert export_snapshots([(timestamp, table)], fmt="bin", filename=path) == len(table)
+
+    (read_timestamp, read_table), = load_columnar(path)
+    assert read_timestamp == timestamp
+    assert sorted(read_table.column("Total Lots")) == sorted(table.column("Total Lots"))
+    assert sorted(read_table.column("Address")) == sorted(table.column("Address"))
+
+
+def test_columnar_is_little_endian(tmp_path):
+    timestamp, table = load_carpark_availability("carpark-availability-v1.csv")
+    table = associate_carpark_info(table, get_carpark_information())
+    path = str(tmp_path / "export.bin")
+    export_snapshots([(timestamp, table)], fmt="bin", sort_key="Total Lots", filename=path)
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    # Skip the magic, row count, timestamp and carpark numbers to the Total Lots column
+    offset = len(BLOCK_MAGIC)
+    count, = struct.unpack_from("<I", data, offset)
+    offset += 4
+    for _ in range(2):
+        length, = struct.unpack_from("<I", data, offset)
+        offset += 4 + length
+
+    totals = struct.unpack_from("<{}i".format(count), data, offset)
+    assert list(totals) == sorted(table.column("Total Lots"))
@@ -0,0 +1,106 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# test_fetch.py
+# Checks the fetch client against the stub server in tools, through the
+# counters the server reports at /stats
+
+import functools
+import time
+from http.server import ThreadingHTTPServer
+from typing import Tuple
+
+import dotenv
+import pytest
+
+from tools import stub_server
+from utils.carpark import get_realtime_info
+from utils.fetch import FetchClient
+
+REALTIME_PATH = "/v1/transport/carpark-availability"
+LTA_PATH = "/ltaodataservice/CarParkAvailabilityv2"
+
+
+def start(**kwargs) -> Tuple[ThreadingHTTPServer, str]:
+    """Starts a stub server on a free port, returning its URL"""
+    server = stub_server.serve(0, **kwargs)
+    return server, "http://127.0.0.1:{}".format(server.server_port)
+
+
+@pytest.fixture
+def stub():
+    server, url = start()
+    yield url
+    server.shutdown()
+
+
+def stats(url: str) -> dict:
+    """Gets the counters of the stub server"""
+    return FetchClient().get_json(url + "/stats").data
+
+
+def test_connections_are_reused(stub):
+    client = FetchClient()
+    for _ in range(5):
+        client.get_json(stub + REALTIME_PATH)
+
+    counters = stats(stub)
+    assert counters["requests"] == 5
+    # One connection for the requests, one for /stats
+    assert counters["connections"] == 2
+
+
+def test_not_modified_returns_cached_data(stub):
+    client = FetchClient()
+    first = client.get_json(stub + REALTIME_PATH)
+    second = client.get_json(stub + REALTIME_PATH)
+
+    assert first.modified and not second.modified
+    assert second.data is first.data
+    assert stats(stub)["not_modified"] == 1
+
+
+def test_timeout_from_env_applies_at_request_time(tmp_path, monkeypatch):
+    server, url = start(delay=1.0)
+
+    # .env is only loaded once realtime data is fetched, after the shared client exists
+    env = tmp_path / ".env"
+    env.write_text("REALTIME_URL={}\nHTTP_READ_TIMEOUT=0.2\n".format(url + REALTIME_PATH))
+    monkeypatch.setattr(dotenv, "load_dotenv", functools.partial(dotenv.load_dotenv, env))
+    for name in ["REALTIME_URL", "HTTP_CONNECT_TIMEOUT", "HTTP_READ_TIMEOUT"]:
+        monkeypatch.setenv(name, "")
+        monkeypatch.delenv(name)
+
+    try:
+        start_time = time.perf_counter()
+        assert get_realtime_info(quiet=True) is None
+        assert time.perf_counter() - start_time < 0.9
+    finally:
+        server.shutdown()
+
+
+@pytest.mark.parametrize("records", [2199 * 5, 2000, 500, 499])
+def test_every_page_is_fetched(records):
+    server, url = start(copies=5)
+    # Page counts that are exact multiples of the page size end on an empty page
+    server.RequestHandlerClass.state.lta = server.RequestHandlerClass.state.lta[:records]
+
+    try:
+        pages = list(FetchClient().get_pages(url + LTA_PATH, stub_server.LTA_PAGE_SIZE))
+        assert sum(map(len, pages)) == records
+
+        # No more than a window of pages past the last one is requested
+        assert stats(url)["requests"] <= records // stub_server.LTA_PAGE_SIZE + 4
+    finally:
+        server.shutdown()
+
+
+def test_pages_in_flight_are_limited():
+    server, url = start(delay=0.05, copies=5)
+
+    try:
+        pages = list(FetchClient().get_pages(url + LTA_PATH, stub_server.LTA_PAGE_SIZE, max_in_flight=4))
+        assert sum(map(len, pages)) == 2199 * 5
+        assert 1 < stats(url)["max_in_flight"] <= 4
+    finally:
+        server.shutdown()
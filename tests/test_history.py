@@ -0,0 +1,69 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# test_history.py
+# Checks snapshots stored in the history can be read back and exported
+
+import json
+
+import pytest
+
+from utils.carpark import get_carpark_information, load_carpark_availability
+from utils.export import export_snapshots, load_columnar
+from utils.history import HistoryStore
+
+FILES = ["carpark-availability-v1.csv", "carpark-availability-v2.csv"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A history holding both availability files"""
+    store = HistoryStore(str(tmp_path / "history"))
+    for filename in FILES:
+        store.append(*load_carpark_availability(filename))
+    return store
+
+
+def test_linked_snapshots_keep_their_timestamps(store):
+    expected = [load_carpark_availability(filename)[0] for filename in FILES]
+    assert [timestamp for timestamp, _ in store.linked(get_carpark_information())] == expected
+
+
+def test_export_history_jsonl(store, tmp_path):
+    path = str(tmp_path / "export.jsonl")
+    rows = export_snapshots(store.linked(get_carpark_information()), fmt="jsonl",
+                            sort_key="Percentage", descending=True, filename=path)
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+
+    assert rows == len(records) == 1931 + 1934
+    assert records[0]["Timestamp"] == "2023-06-19T11:10:27+08:00"
+    assert records[-1]["Timestamp"] == "2023-06-20T23:01:26+08:00"
+
+
+def test_export_history_csv(store, tmp_path):
+    path = str(tmp_path / "export.csv")
+    export_snapshots(store.linked(get_carpark_information()), fmt="csv", filename=path)
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+
+    assert lines[0] == "Timestamp: 2023-06-19T11:10:27+08:00"
+    assert lines[1933] == "Timestamp: 2023-06-20T23:01:26+08:00"
+    assert len(lines) == 1931 + 1934 + 4
+
+
+def test_export_history_columnar(store, tmp_path):
+    path = str(tmp_path / "export.bin")
+    export_snapshots(store.linked(get_carpark_information()), fmt="bin", filename=path)
+
+    snapshots = list(load_columnar(path))
+    assert [len(table) for _, table in snapshots] == [1931, 1934]
+    assert snapshots[1][0] == "Timestamp: 2023-06-20T23:01:26+08:00"
+
+
+def test_before(store):
+    time, table = store.before("2023-06-20T23:01:26+08:00")
+    assert len(table) == 1931
+    assert store.before(time) is None
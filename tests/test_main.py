@@ -0,0 +1,31 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# test_main.py
+# Checks batch options given without queries are rejected instead of ignored
+
+import sys
+
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("argv", [
+    ["-f", "carpark-availability-v1.csv"],
+    ["--workers", "2"],
+])
+def test_batch_options_need_queries(argv, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["main.py"] + argv)
+
+    with pytest.raises(SystemExit) as e:
+        main.main()
+
+    assert e.value.code == 2
+    assert "need queries" in capsys.readouterr().err
+
+
+def test_batch_mode(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["main.py", "-f", "carpark-availability-v1.csv", "-q", "count"])
+    main.main()
+    assert '"result": 1931' in capsys.readouterr().out
@@ -0,0 +1,19 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# test_table.py
+# Checks searches over a text column build its index on first use
+
+from utils.carpark import associate_carpark_info, get_carpark_information, load_carpark_availability
+
+
+def test_search_builds_text_index_lazily():
+    _, table = load_carpark_availability("carpark-availability-v1.csv")
+    table = associate_carpark_info(table, get_carpark_information())
+    assert "Address" not in table.text_indexes
+
+    addresses = table.column("Address")
+    for query in ["ANG MO KIO", "BLK 1", "ST", ""]:
+        expected = [i for i, address in enumerate(addresses) if query in address]
+        assert table.search("Address", query) == expected
+    assert "Address" in table.text_indexes
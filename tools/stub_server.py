@@ -0,0 +1,213 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# stub_server.py
+# Local stand-in for the data.gov.sg and LTA Datamall endpoints, serves
+# the files in ./res so the realtime fetchers can be checked offline
+#
+# Usage (from the directory containing main.py):
+#   python tools/stub_server.py [port] [availability file] [delay in seconds]
+#
+# Then point the app at it in .env:
+#   REALTIME_URL=http://127.0.0.1:8000/v1/transport/carpark-availability
+#   LTA_URL=http://127.0.0.1:8000/ltaodataservice/CarParkAvailabilityv2
+#
+# GET /stats returns how many connections were opened, requests served,
+# 304 responses sent and the most requests handled at the same time, to check
+# the fetch client's connection reuse and its limit on pages in flight.
+
+import hashlib
+import json
+import sys
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, ".")
+
+from utils.carpark import load_carpark_availability  # noqa: E402
+from utils.files import CsvReader  # noqa: E402
+
+# Records per page of the LTA endpoint, same as the real one
+LTA_PAGE_SIZE = 500
+
+
+def realtime_payload(filename: str) -> dict:
+    """Formats an availability file like the data.gov.sg response"""
+    timestamp, table = load_carpark_availability(filename)
+
+    carpark_data = []
+    for cp in table:
+        carpark_data.append({
+            "carpark_info": [{
+                "total_lots": str(cp["Total Lots"]),
+                "lot_type": "C",
+                "lots_available": str(cp["Lots Available"]),
+            }],
+            "carpark_number": cp["Carpark Number"],
+            "update_datetime": timestamp.removeprefix("Timestamp: ")[:19],
+        })
+
+    return {"items": [{
+        "timestamp": timestamp.removeprefix("Timestamp: "),
+        "carpark_data": carpark_data,
+    }]}
+
+
+def lta_records() -> list:
+    """Formats carpark-information.csv like the LTA CarParkAvailabilityv2 records,
+    with made up but stable coordinates around Singapore"""
+    records = []
+    for cp in CsvReader("carpark-information.csv"):
+        number = cp["Carpark Number"]
+        seed = zlib.crc32(number.encode())
+        latitude = 1.27 + (seed % 1000) / 1000 * 0.17
+        longitude = 103.65 + (seed // 1000 % 1000) / 1000 * 0.33
+
+        records.append({
+            "CarParkID": number,
+            "Area": "",
+            "Development": cp["Address"],
+            "Location": "{:.6f} {:.6f}".format(latitude, longitude),
+            "AvailableLots": seed % 300,
+            "LotType": "C",
+            "Agency": "HDB",
+        })
+
+    return records
+
+
+class StubState:
+    """Payloads served and counters shared by every handler thread"""
+
+    def __init__(self, availability_file: str, delay: float = 0.0, copies: int = 1):
+        self.realtime = json.dumps(realtime_payload(availability_file)).encode()
+        self.etag = '"{}"'.format(hashlib.sha1(self.realtime).hexdigest())
+        self.last_modified = formatdate(usegmt=True)
+        self.lta = lta_records() * copies
+        self.delay = delay
+
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"connections": 0, "requests": 0, "not_modified": 0, "max_in_flight": 0}
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.stats[name] += 1
+
+    def enter(self) -> None:
+        with self.lock:
+            self.stats["requests"] += 1
+            self.in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+
+    def leave(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests
+    protocol_version = "HTTP/1.1"
+    state: StubState
+
+    def setup(self):
+        super().setup()
+        self.state.count("connections")
+
+    def log_message(self, *_):
+        pass
+
+    def send_json(self, body: bytes, headers: dict | None = None):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path == "/stats":
+            with self.state.lock:
+                self.send_json(json.dumps(self.state.stats).encode())
+            return
+
+        self.state.enter()
+        try:
+            # Simulate a slow upstream, so concurrent requests overlap
+            time.sleep(self.state.delay)
+            self.handle_endpoint(url)
+        finally:
+            self.state.leave()
+
+    def handle_endpoint(self, url):
+        if url.path == "/v1/transport/carpark-availability":
+            # Answer conditional requests for an unchanged payload with 304
+            if (self.headers.get("If-None-Match") == self.state.etag
+                    or self.headers.get("If-Modified-Since") == self.state.last_modified):
+                self.state.count("not_modified")
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            self.send_json(self.state.realtime, {
+                "ETag": self.state.etag,
+                "Last-Modified": self.state.last_modified,
+            })
+
+        elif url.path == "/ltaodataservice/CarParkAvailabilityv2":
+            skip = int(parse_qs(url.query).get("$skip", ["0"])[0])
+            page = self.state.lta[skip:skip + LTA_PAGE_SIZE]
+            self.send_json(json.dumps({"value": page}).encode())
+
+        else:
+            self.send_error(404)
+
+
+def serve(
+        port: int = 8000,
+        availability_file: str = "carpark-availability-v2.csv",
+        delay: float = 0.0,
+        copies: int = 1
+) -> ThreadingHTTPServer:
+    """Starts the stub server on a background thread
+
+    Args:
+        port (int): Port to listen on, 0 to pick a free port
+        availability_file (str): Availability file in ./res served as realtime data
+        delay (float): Seconds to wait before answering each request
+        copies (int): Times the LTA records are repeated, to serve more pages
+
+    Returns:
+        ThreadingHTTPServer: The running server, call `shutdown()` to stop it
+    """
+    state = StubState(availability_file, delay, copies)
+    handler = type("Handler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    availability_file = sys.argv[2] if len(sys.argv) > 2 else "carpark-availability-v2.csv"
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+
+    server = serve(port, availability_file, delay)
+    print("Serving stub endpoints on http://127.0.0.1:{}".format(server.server_port))
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
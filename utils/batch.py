@@ -0,0 +1,250 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# batch.py
+# Runs menu queries without prompting, against any number of availability
+# files loaded once, and writes the results as JSON lines
+
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, TextIO, Tuple
+
+from utils.carpark import get_carpark_information
+from utils.carpark import get_carpark_locations
+from utils.export import EXPORT_FORMATS, SORT_KEYS, export_snapshots
+from utils.files import resource_path
+from utils.ingest import load_snapshots
+from utils.table import CarparkTable
+
+# Columns of the carparks in query results
+RESULT_COLUMNS = ["Carpark Number", "Total Lots", "Lots Available", "Percentage", "Address"]
+
+# Columns `top` queries can rank by
+RANK_COLUMNS = ["Total Lots", "Lots Available", "Percentage"]
+
+
+class Query(NamedTuple):
+    """A parsed query, e.g. "percentage:50" """
+    text: str
+    name: str
+    args: Tuple[Any, ...]
+
+
+def _choice(values: List[str]) -> Callable[[str], str]:
+    """Makes an argument converter accepting one of the values, ignoring case"""
+    def convert(value: str) -> str:
+        for accepted in values:
+            if value.lower() == accepted.lower():
+                return accepted
+        raise ValueError("expected one of: " + ", ".join(values))
+    return convert
+
+
+# Argument converters of every query, and the defaults of the optional ones.
+# The comment shows the menu option each query answers
+QUERIES: Dict[str, Tuple[List[Callable[[str], Any]], Tuple[Any, ...]]] = {
+    "total": ([], ()),  # [1]
+    "basement": ([], ()),  # [2]
+    "count": ([], ()),  # [4]
+    "full": ([], ()),  # [5]
+    "percentage": ([float], ()),  # [6]
+    "addresses": ([float], ()),  # [7]
+    "location": ([str], ()),  # [8]
+    "most-lots": ([], ()),  # [9]
+    "export": ([_choice(EXPORT_FORMATS), _choice(SORT_KEYS)], (SORT_KEYS[0],)),  # [10]
+    "top": ([int, _choice(RANK_COLUMNS), _choice(["high", "low"])], ("Total Lots", "high")),  # [11]
+    "nearest": ([float, float, int, float, int], (5, 0.0, 0)),  # [12]
+}
+
+# Queries answered from carpark-information.csv, the same for every file
+INFO_QUERIES = ("total", "basement")
+
+
+def parse_query(text: str) -> Query:
+    """Parses a query of the form name[:arg[:arg...]]
+
+    Examples:
+        ```py
+        parse_query("percentage:50")  # Query("percentage:50", "percentage", (50.0,))
+        parse_query("top:10:percentage:low")
+        parse_query("nearest:1.3521:103.8198:5:50:10")  # latitude, longitude, k, %, lots
+        ```
+
+    Args:
+        text (str): The query
+
+    Raises:
+        ValueError: If the query is unknown or its arguments are invalid
+
+    Returns:
+        Query: The parsed query
+    """
+    name, *args = text.strip().split(":")
+    name = name.lower()
+    if name not in QUERIES:
+        raise ValueError("Unknown query '{}', expected one of: {}"
+                         .format(name, ", ".join(QUERIES)))
+
+    # Fill in the optional arguments
+    converters, defaults = QUERIES[name]
+    required = len(converters) - len(defaults)
+    if not required <= len(args) <= len(converters):
+        raise ValueError("Query '{}' takes {} to {} arguments, got {}"
+                         .format(name, required, len(converters), len(args)))
+
+    values = []
+    for i, converter in enumerate(converters):
+        if i >= len(args):
+            values.append(defaults[i - required])
+            continue
+        try:
+            values.append(converter(args[i]))
+        except ValueError as e:
+            raise ValueError("Invalid argument '{}' to query '{}': {}".format(args[i], name, e))
+
+    return Query(text, name, tuple(values))
+
+
+def _rows(table: CarparkTable, indices: Iterable[int], columns: List[str] = RESULT_COLUMNS) -> List[Dict[str, Any]]:
+    """Formats rows of a table as dictionaries of the given columns"""
+    table_columns = [(name, table.column(name)) for name in columns]
+    return [{name: column[i] for name, column in table_columns} for i in indices]
+
+
+def run_query(
+        query: Query,
+        carpark_info: CarparkTable,
+        all_cp_info: CarparkTable | None = None,
+        timestamp: str | None = None,
+        filename: str | None = None
+) -> Any:
+    """Answers a query
+
+    Args:
+        query (Query): The parsed query
+        carpark_info (CarparkTable): The carpark information
+        all_cp_info (CarparkTable | None): The linked availability of a file,
+        None for queries in INFO_QUERIES
+        timestamp (str | None): The file's timestamp line, written to exports,
+        None if the file has none
+        filename (str | None): Name of the availability file, used to name exports
+
+    Returns:
+        Any: The result, which can be written as JSON
+    """
+    name, args = query.name, query.args
+
+    if name == "total":
+        return len(carpark_info)
+    if name == "basement":
+        return _rows(carpark_info, (i for i, cp_type in enumerate(carpark_info.column("Carpark Type"))
+                                    if cp_type == "BASEMENT CAR PARK"),
+                     ["Carpark Number", "Carpark Type", "Address"])
+    if name == "count":
+        return len(all_cp_info)
+    if name == "full":
+        return _rows(all_cp_info, all_cp_info.select({"Lots Available": (0, 0)}))
+    if name == "percentage":
+        return _rows(all_cp_info, all_cp_info.select({"Percentage": (args[0], None)}))
+    if name == "addresses":
+        return _rows(all_cp_info, all_cp_info.select({"Percentage": (args[0], None)}),
+                     ["Carpark Number", "Percentage", "Address"])
+    if name == "location":
+        return _rows(all_cp_info, all_cp_info.search("Address", args[0].upper()))
+    if name == "most-lots":
+        # None for files without carparks
+        most_lots = _rows(all_cp_info, all_cp_info.top("Total Lots", 1))
+        return most_lots[0] if most_lots else None
+    if name == "top":
+        k, column, order = args
+        return _rows(all_cp_info, all_cp_info.top(column, k, largest=order == "high"))
+
+    if name == "export":
+        fmt, sort_key = args
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        export_name = "{}-with-addresses.{}".format(stem, fmt)
+        rows = export_snapshots([(timestamp, all_cp_info)], fmt=fmt,
+                                sort_key=sort_key, filename=export_name)
+        return {"file": export_name, "rows": rows}
+
+    # Nearest carparks, with their distance
+    latitude, longitude, k, percentage, lots = args
+    nearest = all_cp_info.nearest("Location", latitude, longitude, k,
+                                  {"Percentage": (percentage, None), "Lots Available": (lots, None)})
+    results = _rows(all_cp_info, (row for row, _ in nearest))
+    for result, (_, distance) in zip(results, nearest):
+        result["Distance (km)"] = distance
+    return results
+
+
+def resolve_file(filename: str) -> str:
+    """Resolves an availability file given by name in ./res or by path
+
+    Args:
+        filename (str): Name of a file in ./res, or a path to any file
+
+    Returns:
+        str: The name to load, absolute paths are used as they are
+    """
+    if not os.path.exists(resource_path(filename)) and os.path.exists(filename):
+        return os.path.abspath(filename)
+    return filename
+
+
+def run_batch(files: List[str], queries: List[Query], out: TextIO, workers: int | None = None) -> int:
+    """Runs every query against every availability file, writing a JSON line per answer
+
+    The carpark information is loaded once, and each file is parsed once in a
+    pool of worker processes and linked once, however many queries are run against it.
+
+    Examples:
+        ```py
+        run_batch(["carpark-availability-v1.csv"], [parse_query("count")], sys.stdout)
+        # {"file": "carpark-availability-v1.csv", "timestamp": "...", "query": "count", "result": 1931}
+        ```
+
+    Args:
+        files (List[str]): Availability files, see `resolve_file`
+        queries (List[Query]): The parsed queries
+        out (TextIO): Where the JSON lines are written
+        workers (int | None): Most processes parsing files, None for one per core
+
+    Raises:
+        ValueError: If availability queries were given without any files
+
+    Returns:
+        int: Number of lines written
+    """
+    carpark_info = get_carpark_information()
+    info_queries = [query for query in queries if query.name in INFO_QUERIES]
+    file_queries = [query for query in queries if query.name not in INFO_QUERIES]
+    if file_queries and not files:
+        raise ValueError("Query '{}' needs an availability file".format(file_queries[0].text))
+
+    lines = 0
+
+    def write(filename: str | None, timestamp: str | None, query: Query, result: Any) -> None:
+        nonlocal lines
+        out.write(json.dumps({"file": filename, "timestamp": timestamp,
+                              "query": query.text, "result": result}) + "\n")
+        lines += 1
+
+    for query in info_queries:
+        write(None, None, query, run_query(query, carpark_info))
+
+    # Parse every file at once, then link and query them one at a time
+    snapshots = load_snapshots([resolve_file(filename) for filename in files] if file_queries else [],
+                               max_workers=workers)
+
+    # Carpark locations are only loaded if a query needs them. They may be refreshed
+    # on a background thread, so only once the worker processes have been forked
+    locations = None
+    if any(query.name == "nearest" for query in file_queries):
+        locations = get_carpark_locations()
+
+    for filename, (timestamp, all_cp_info) in zip(files, snapshots.linked(carpark_info, locations)):
+        for query in file_queries:
+            write(filename, timestamp and timestamp.removeprefix("Timestamp: "), query,
+                  run_query(query, carpark_info, all_cp_info, timestamp, filename))
+
+    return lines
@@ -6,202 +6,323 @@
 # In charge of giving properly formatted carpark information
 
 import os
-import sys
-from typing import Dict, List
+import threading
+import time
+from typing import Dict, Tuple
 
-import dotenv
-import requests
+from utils.fetch import client
+from utils.files import CsvReader, file_signature, load_cache, write_cache
+from utils.table import INT_COLUMNS, CarparkTable
+from utils.vectorized import availability_buckets, join_rows, percentages, take
 
-from utils.files import load_file
+# Realtime endpoints, overridable with REALTIME_URL and LTA_URL in .env
+REALTIME_URL = "https://api.data.gov.sg/v1/transport/carpark-availability"
+LTA_URL = "http://datamall2.mytransport.sg/ltaodataservice/CarParkAvailabilityv2"
 
+# Records per page of the LTA endpoint, and pages requested at the same time
+LTA_PAGE_SIZE = 500
+LTA_MAX_IN_FLIGHT = 4
 
-def get_carpark_information() -> List[Dict[str, str]]:
+CARPARK_INFO_FILE = "carpark-information.csv"
+CARPARK_INFO_CACHE = "carpark-information.cache"
+CARPARK_INFO_CACHE_VERSION = 1
+
+# Carpark coordinates cache, refreshed after LOCATION_TTL seconds
+LOCATION_CACHE = "carpark-locations.cache"
+LOCATION_CACHE_VERSION = 1
+LOCATION_TTL = 7 * 24 * 60 * 60
+
+# Converters for the typed columns of availability files
+COLUMN_TYPES = {column: int for column in INT_COLUMNS}
+
+# Carpark information loaded by get_carpark_information,
+# together with the signature of the file it was parsed from
+carpark_info: CarparkTable | None = None
+carpark_info_signature: Tuple[int, int] | None = None
+
+# Time fetched and carpark locations loaded by get_carpark_locations,
+# and the thread refreshing them in the background
+carpark_locations: Tuple[float, Dict[str, Tuple[float, float]]] | None = None
+location_refresh: threading.Thread | None = None
+location_lock = threading.Lock()
+
+
+def get_carpark_information() -> CarparkTable:
     """Loads and caches the carpark information
 
+    The table is kept in memory and in a compact on-disk copy, both are
+    reused until the modification time or size of the CSV file changes.
+
     Returns:
-        List[Dict[str, str]]: List of carpark information formatted accordingly
+        CarparkTable: Table of carpark information formatted accordingly
     """
-    global carpark_info
+    global carpark_info, carpark_info_signature
+
+    # Reuse the loaded information if the file hasn't changed
+    signature = file_signature(CARPARK_INFO_FILE)
+    if carpark_info is not None and carpark_info_signature == signature:
+        return carpark_info
+
+    # Try the on-disk copy before parsing the CSV file
+    cache_signature = (CARPARK_INFO_CACHE_VERSION, signature)
+    columns = load_cache(CARPARK_INFO_CACHE, cache_signature)
+    if columns is not None:
+        carpark_info = CarparkTable.from_columns(columns)
+    else:
+        carpark_info = parse_carpark_information(CsvReader(CARPARK_INFO_FILE))
+        write_cache(CARPARK_INFO_CACHE, cache_signature,
+                    carpark_info.to_columns())
 
-    carpark_info = load_file("carpark-information.csv")
-    carpark_info = parse_carpark_information(carpark_info)
+    carpark_info_signature = signature
+
+    # Key the information by carpark number for associate_carpark_info
+    carpark_info.index_by("Carpark Number")
 
     # Return carpark information
     return carpark_info
 
 
 def associate_carpark_info(
-        available_cps: List[Dict[str, str]],
-        carpark_info: List[Dict[str, str]],
-        get_location: bool = False
-) -> List[Dict[str, str]]:
+        available_cps: CarparkTable,
+        carpark_info: CarparkTable,
+        get_location: bool = False,
+        locations: Dict[str, Tuple[float, float]] | None = None
+) -> CarparkTable:
     """Function to load all carpark information based on filename,
     without caching
 
     Args:
-        available_cps (List[Dict[str, str]]): The carpark data formatted accordingly
-        carpark_info (List[Dict[str, str]]): The carpark info formatted accordingly
+        available_cps (CarparkTable): The carpark data formatted accordingly
+        carpark_info (CarparkTable): The carpark info formatted accordingly
         get_location (bool): Whether to associate location data with the info
+        locations (Dict[str, Tuple[float, float]] | None): Already fetched carpark locations to associate,
+        instead of fetching them when `get_location` is set
 
     Returns:
-        List[Dict[str, str]]: All carpark information formatted accordingly
+        CarparkTable: All carpark information formatted accordingly
     """
 
     # Make all_carpark_info global to overwrite
     global all_carpark_info
 
-    # Load carpark info into a structure of:
-    # {carpark_name: [list_of_carpark_info]}
-    cp_info = {}
-    for cp in carpark_info:
-        cp_info[cp["Carpark Number"]] = [
-            cp["Carpark Type"],
-            cp["Type of Parking System"],
-            cp["Address"]
-        ]
+    # Map carpark numbers to their row in carpark_info,
+    # built once per table and reused on later calls
+    cp_info = carpark_info.index_by("Carpark Number")
 
     # Load location information if required
-    if get_location:
+    if locations is not None:
+        get_location = True
+    elif get_location:
         locations = get_carpark_locations()
-        for carpark_no, location in locations.items():
-            # Tries to load information
-            try:
-                cp_info[carpark_no].append(location)
-            except KeyError:
-                pass
-
-    # Map all the available carparks into the loaded cp_info,
-    # Leaves some values blank if no associated carpark is found
-    for cp in available_cps:
-        # Map type & address
-        try:
-            cp_data = cp_info[cp["Carpark Number"]]
-            cp["Carpark Type"] = cp_data[0]
-            cp["Type of Parking System"] = cp_data[1]
-            cp["Address"] = cp_data[2]
-        except KeyError:
-            cp["Carpark Type"] = ""
-            cp["Type of Parking System"] = ""
-            cp["Address"] = ""
-
-        # Map location
-        if get_location and cp_data:
-            try:
-                cp["Location"] = cp_data[3]
-            except IndexError:
-                cp["Location"] = None  # None if carpark location isn't found
-
-        # Map percentage
-        available_lots = int(cp["Lots Available"])
-        total_lots = int(cp["Total Lots"])
-
-        if total_lots != 0:
-            percentage = (available_lots / total_lots) * 100
-        else:
-            percentage = 0.0
-
-        cp["Percentage"] = percentage
+    else:
+        locations = {}
+
+    # Look up the row of every carpark in cp_info once, then join each column
+    # through those rows, leaving values blank if no associated carpark is found
+    rows = join_rows(available_cps.column("Carpark Number"), cp_info)
+    for column in ("Carpark Type", "Type of Parking System", "Address"):
+        available_cps.add_column(column, take(carpark_info.column(column), rows, ""))
+
+    # Map location, None if carpark location isn't found
+    if get_location:
+        info_locations = [locations.get(num) for num in carpark_info.column("Carpark Number")]
+        available_cps.add_column("Location", take(info_locations, rows, None))
+
+    # Map percentage, 0 for carparks without lots
+    available_cps.add_column("Percentage", percentages(available_cps.column("Lots Available"),
+                                                       available_cps.column("Total Lots")))
+
+    # Map the availability bucket deciding each carpark's marker colour
+    available_cps.add_column("Availability Bucket", availability_buckets(available_cps.column("Percentage")))
+
+    # Index the numeric columns for threshold and range queries
+    for column in ("Percentage", "Lots Available", "Total Lots"):
+        available_cps.build_sorted_index(column)
+
+    # Index the locations for nearest carpark queries
+    if get_location:
+        available_cps.build_spatial_index("Location", ("Percentage", "Lots Available"))
 
     all_carpark_info = available_cps
     return all_carpark_info
 
 
-def parse_carpark_information(data: List[str]) -> List[Dict[str, str]]:
-    """Function to parse carpark information, parses into a list of
-    dictionaries with the key as the header, and the value as the 
-    respective values
+def parse_carpark_information(data: CsvReader) -> CarparkTable:
+    """Function to parse carpark information into a CarparkTable,
+    with a column per header, lot counts are converted to integers
 
     Args:
-        data (List[str]): Carpark information in a list of strings
+        data (CsvReader): Reader streaming the carpark information
 
     Returns:
-        List[Dict[str, str]]: List of dictionaries containing the parsed information
+        CarparkTable: Table containing the parsed information
     """
-    # Initialise return variable
-    carpark_information = []
+    # Initialise return variable with the CSV headers
+    carpark_information = CarparkTable(data.headers)
 
-    # Get CSV headers
-    headers = data.pop(0)
-
-    # Loop through data, format and append
+    # Loop through the streamed records and append
     for info in data:
-        carpark_dict = {k: v for k, v in zip(
-            headers.split(',', 3), info.split(',', 3))}
-        carpark_information.append(carpark_dict)
+        carpark_information.append(info)
 
-    # Return the list of dicts
+    # Return the table
     return carpark_information
 
 
-def get_carpark_locations() -> Dict[str, str]:
-    """Gets the realtime carpark location datafrom LTA API
+def load_carpark_availability(filename: str) -> Tuple[str, CarparkTable]:
+    """Reads and parses a carpark availability file in ./res
+
+    Args:
+        filename (str): Name of the availability file
 
     Returns:
-        Dict[str, str]: The realtime carpark location
+        Tuple[str, CarparkTable]: The file's timestamp line and its parsed data
     """
-    # Loads the neccessary API keys
+    reader = CsvReader(filename, COLUMN_TYPES)
+    return reader.timestamp, parse_carpark_information(reader)
+
+
+def _load_env() -> None:
+    """Loads the .env file, dotenv is imported here as it is only needed for realtime data"""
+    import dotenv
     dotenv.load_dotenv()
+
+
+def fetch_carpark_locations() -> Dict[str, Tuple[float, float]]:
+    """Gets the realtime carpark location data from LTA API
+
+    WARNING: Raises an exception if the data cannot be retrieved
+
+    Returns:
+        Dict[str, Tuple[float, float]]: Latitude and longitude keyed by carpark number
+    """
+    # Loads the neccessary API keys
+    _load_env()
     api_key = os.getenv("API_KEY")
 
-    # Make the request to LTA API
-    r = requests.get("http://datamall2.mytransport.sg/ltaodataservice/CarParkAvailabilityv2",
-                     headers={"AccountKey": api_key})
+    # Request every page of the LTA API through the shared client,
+    # formatting each page as it arrives
+    formatted_data = {}
+    for page in client.get_pages(os.getenv("LTA_URL", LTA_URL), LTA_PAGE_SIZE,
+                                 headers={"AccountKey": api_key},
+                                 max_in_flight=LTA_MAX_IN_FLIGHT):
+        for cp in page:
+            # Skip if not HDB Carpark or without a location
+            if cp["Agency"] != "HDB" or not cp["Location"]:
+                continue
+
+            # Map location to carpark number, parsed into floats once
+            latitude, longitude = cp["Location"].split(" ")
+            formatted_data[cp["CarParkID"]] = (float(latitude), float(longitude))
+
+    return formatted_data
+
+
+def _refresh_locations() -> Dict[str, Tuple[float, float]] | None:
+    """Fetches the carpark locations and saves them to the location cache
+
+    Returns:
+        Dict[str, Tuple[float, float]] | None: The locations, None if they couldn't be fetched
+    """
+    global carpark_locations
 
-    # Tries to load realtime data, crashes when data cannot be retrieved
     try:
-        realtime_data = r.json()["value"]
+        locations = fetch_carpark_locations()
     except Exception as e:
         print("Couldn't load realtime LTA data!")
         print("Error: {}".format(e))
-        sys.exit(1)
+        return None
 
-    # Formats data
-    formatted_data = {}
-    for cp in realtime_data:
-        # Skip if not HDB Carpark
-        if cp["Agency"] != "HDB":
-            continue
+    write_cache(LOCATION_CACHE, LOCATION_CACHE_VERSION, (time.time(), locations))
+    carpark_locations = (time.time(), locations)
+    return locations
 
-        # Map location to carpark number
-        formatted_data[cp["CarParkID"]] = cp["Location"]
 
-    return formatted_data
+def _refresh_locations_in_background() -> None:
+    """Starts refreshing the location cache on a daemon thread,
+    unless a refresh is already running"""
+    global location_refresh
+
+    with location_lock:
+        if location_refresh is not None and location_refresh.is_alive():
+            return
+
+        location_refresh = threading.Thread(target=_refresh_locations, daemon=True)
+        location_refresh.start()
+
+
+def get_carpark_locations(ttl: float | None = None) -> Dict[str, Tuple[float, float]]:
+    """Gets the carpark locations, from the location cache in ./res if possible
+
+    Cached locations are returned straight away, if they are older than `ttl`
+    they are refreshed from LTA API in the background for the next call.
+    The API is only waited on when nothing is cached yet.
+
+    Args:
+        ttl (float | None): Seconds before cached locations are refreshed,
+        defaults to LOCATION_TTL in .env or a week
+
+    Returns:
+        Dict[str, Tuple[float, float]]: Latitude and longitude keyed by carpark number,
+        empty if nothing is cached and LTA API cannot be reached
+    """
+    global carpark_locations
+
+    if ttl is None:
+        _load_env()
+        ttl = float(os.getenv("LOCATION_TTL", LOCATION_TTL))
+
+    # Load the on-disk cache on first use
+    if carpark_locations is None:
+        carpark_locations = load_cache(LOCATION_CACHE, LOCATION_CACHE_VERSION)
+
+    # Nothing cached, wait for the API
+    if carpark_locations is None:
+        locations = _refresh_locations()
+        return locations if locations is not None else {}
+
+    # Serve the cache, refreshing it if it is out of date
+    fetched_at, locations = carpark_locations
+    if time.time() - fetched_at > ttl:
+        _refresh_locations_in_background()
 
+    return locations
 
-def get_realtime_info() -> List[Dict[str, str]] | None:
+
+def get_realtime_info(quiet: bool = False) -> Tuple[str, CarparkTable] | None:
     """Gets the realtime parking data from gov API
 
+    Args:
+        quiet (bool): Whether to leave errors unprinted, e.g. when polling in the
+        background, where they would print over the menu prompt
+
     Returns:
-        List[Dict[str, str]]: The carpark data formatted
+        Tuple[str, CarparkTable] | None: The timestamp and the carpark data formatted,
+        None if the data could not be retrieved
     """
+    _load_env()
 
-    # Get data from API
+    # Get data from API through the shared client, decoded once
     try:
-        r = requests.get(
-            "https://api.data.gov.sg/v1/transport/carpark-availability")
+        response = client.get_json(os.getenv("REALTIME_URL", REALTIME_URL)).data
     except Exception as e:
-        print("Error while fetching data!")
-        print("Error: " + str(e))
+        if not quiet:
+            print("Error while fetching data!")
+            print("Error: " + str(e))
         return None
 
-    # Get timestamp from data
+    # Get timestamp & data, and handle failed request
     try:
-        timestamp = r.json()["items"][0]["timestamp"]
+        timestamp = response["items"][0]["timestamp"]
         timestamp = "Timestamp: " + timestamp  # Format timestamp correctly
+        data = response["items"][0]["carpark_data"]
     except Exception as e:
-        print("Error while getting realtime info!")
-        print("Error: " + str(e))
-        return None
-
-    # Parse data & Handle failed request
-    try:
-        data = r.json()["items"][0]["carpark_data"]
-    except Exception as e:
-        print("Error while getting realtime info!")
-        print("Error: " + str(e))
+        if not quiet:
+            print("Error while getting realtime info!")
+            print("Error: " + str(e))
         return None
 
-    formatted_data = [timestamp]
+    formatted_data = CarparkTable(
+        ["Carpark Number", "Total Lots", "Lots Available"])
 
     for cp in data:
         cp_info = {}
@@ -210,4 +331,4 @@ def get_realtime_info() -> List[Dict[str, str]] | None:
         cp_info["Lots Available"] = cp["carpark_info"][0]["lots_available"]
         formatted_data.append(cp_info)
 
-    return formatted_data
+    return timestamp, formatted_data
@@ -0,0 +1,131 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# commands.py
+# Registry of menu commands, in charge of dispatching options
+# and recording how long each of them took to run
+
+import builtins
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+
+class CommandRegistry:
+    """Maps menu option numbers to their functions, and records the
+    wall time of every run, and optionally the memory it allocated
+
+    Time spent waiting on `input()` prompts is left out of the wall time and
+    reported on its own, so a command isn't slower because the user was.
+
+    Memory is traced with tracemalloc, which slows every allocation down,
+    so it is only turned on when asked for, e.g. by --timings.
+
+    Examples:
+        ```py
+        registry = CommandRegistry(trace_memory=True)
+        registry.register(1, option_1)
+        registry.run(1, cp_info, all_cp_info)
+        print(registry.summary())
+        ```
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        """
+        Args:
+            trace_memory (bool): Whether to record the peak and net bytes
+            allocated by every run
+        """
+        self.commands: Dict[int, Callable[..., Any]] = {}
+        self.timings: Dict[int, List[tuple[float, float, int, int]]] = {}
+        self.trace_memory = trace_memory
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def register(self, key: int, func: Callable[..., Any]) -> None:
+        """Registers a function under the given option number
+
+        Args:
+            key (int): The option number
+            func (Callable[..., Any]): The function to run for the option
+        """
+        self.commands[key] = func
+        self.timings[key] = []
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.commands
+
+    def run(self, key: int, *args: Any, **kwargs: Any) -> Any:
+        """Runs the command registered under `key`, passing the arguments
+        by reference, and records its wall time, time waiting on input and allocations
+
+        Args:
+            key (int): The option number to run
+
+        Returns:
+            Any: Whatever the command returned
+        """
+        func = self.commands[key]
+
+        # Measure the command, even if it raises. The peak is reset so it only
+        # covers this run, and counts temporaries freed before the command returned
+        traced_before = 0
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+
+        # Time every prompt the command shows, to take it out of the wall time
+        waiting = 0.0
+        prompt = builtins.input
+
+        def timed_input(*prompt_args: Any) -> str:
+            nonlocal waiting
+            prompt_start = time.perf_counter()
+            try:
+                return prompt(*prompt_args)
+            finally:
+                waiting += time.perf_counter() - prompt_start
+
+        builtins.input = timed_input
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start - waiting
+            builtins.input = prompt
+            peak = net = 0
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak -= traced_before
+                net = current - traced_before
+            self.timings[key].append((elapsed, waiting, peak, net))
+
+    def summary(self) -> str:
+        """Formats the recorded timings of every command that has been ran
+
+        Returns:
+            str: A table of runs, total and mean time per command, total time
+            waiting on input, and the highest peak and total net KiB allocated
+            if memory was traced
+        """
+        header = "{:10} {:>5} {:>12} {:>12} {:>12}".format(
+            "Command", "Runs", "Total (ms)", "Mean (ms)", "Input (ms)")
+        if self.trace_memory:
+            header += " {:>14} {:>14}".format("Peak (KiB)", "Net (KiB)")
+        lines = [header]
+
+        for key, runs in self.timings.items():
+            if len(runs) == 0:
+                continue
+
+            total = sum(elapsed for elapsed, _, _, _ in runs) * 1000
+            waiting = sum(waiting for _, waiting, _, _ in runs) * 1000
+            line = "{:10} {:>5} {:>12.3f} {:>12.3f} {:>12.3f}".format(
+                self.commands[key].__name__, len(runs), total, total / len(runs), waiting)
+            if self.trace_memory:
+                line += " {:>14.1f} {:>14.1f}".format(
+                    max(peak for _, _, peak, _ in runs) / 1024, sum(net for _, _, _, net in runs) / 1024)
+            lines.append(line)
+
+        return "\n".join(lines)
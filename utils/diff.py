@@ -0,0 +1,154 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# diff.py
+# Compares two availability snapshots, finding the carparks added, removed
+# and changed between them, and the carparks whose availability moved most
+
+import heapq
+from array import array
+from itertools import repeat
+from typing import Dict, List, NamedTuple
+
+from utils.table import CarparkTable
+from utils.vectorized import percentages
+
+# Changes movers can be ranked by
+MOVER_KEYS = ["Lots Available", "Percentage"]
+
+
+class CarparkChange(NamedTuple):
+    """A carpark in both snapshots whose lots changed, summed over its rows"""
+    number: str
+    row: int
+    old_total: int
+    new_total: int
+    old_available: int
+    new_available: int
+    old_percentage: float
+    new_percentage: float
+
+    @property
+    def available_change(self) -> int:
+        return self.new_available - self.old_available
+
+    @property
+    def percentage_change(self) -> float:
+        return self.new_percentage - self.old_percentage
+
+
+class SnapshotDiff(NamedTuple):
+    """Differences between an old and a new snapshot, by carpark number
+
+    `added` holds the first row of each carpark in the new snapshot, `removed`
+    the first row in the old one, and every change keeps its first row in the new snapshot.
+    """
+    added: array
+    removed: array
+    changed: List[CarparkChange]
+    unchanged: int
+
+    def movers(self, k: int, by: str = "Lots Available") -> List[CarparkChange]:
+        """Gets the carparks whose availability changed most, up or down
+
+        Args:
+            k (int): Number of carparks to get
+            by (str): One of MOVER_KEYS
+
+        Returns:
+            List[CarparkChange]: The k largest changes, largest first
+        """
+        if by == "Percentage":
+            return heapq.nlargest(k, self.changed, key=lambda change: abs(change.percentage_change))
+        return heapq.nlargest(k, self.changed, key=lambda change: abs(change.available_change))
+
+
+class _Carparks(NamedTuple):
+    """The lots of every carpark in a snapshot, summed over its rows"""
+    slots: Dict[str, int]
+    rows: array
+    total_lots: array
+    lots_available: array
+
+
+def _sum_lots(table: CarparkTable) -> _Carparks:
+    """Sums the lots of every carpark, as some carparks are listed once per lot type
+
+    Returns:
+        _Carparks: The first row and summed lots of every carpark, in order of
+        appearance, and the position of each carpark number
+    """
+    carparks = _Carparks({}, array("i"), array("i"), array("i"))
+    for row, (number, total, available) in enumerate(zip(
+            table.column("Carpark Number"), table.column("Total Lots"), table.column("Lots Available"))):
+        slot = carparks.slots.get(number)
+        if slot is None:
+            carparks.slots[number] = len(carparks.rows)
+            carparks.rows.append(row)
+            carparks.total_lots.append(total)
+            carparks.lots_available.append(available)
+        else:
+            carparks.total_lots[slot] += total
+            carparks.lots_available[slot] += available
+
+    return carparks
+
+
+def diff_snapshots(old: CarparkTable, new: CarparkTable) -> SnapshotDiff:
+    """Compares two snapshots carpark by carpark
+
+    Each snapshot is summed per carpark number in one pass, then the carparks
+    are matched through the lookup of the old ones, so the comparison takes
+    linear time. Percentages are computed from the summed lots, so neither
+    snapshot needs to be associated with the carpark information.
+
+    Examples:
+        ```py
+        _, old = load_carpark_availability("carpark-availability-v1.csv")
+        _, new = load_carpark_availability("carpark-availability-v2.csv")
+
+        diff = diff_snapshots(old, new)
+        for change in diff.movers(5):
+            print(change.number, change.available_change)
+        ```
+
+    Args:
+        old (CarparkTable): The earlier snapshot
+        new (CarparkTable): The later snapshot
+
+    Returns:
+        SnapshotDiff: The carparks added, removed and changed
+    """
+    old_carparks, new_carparks = _sum_lots(old), _sum_lots(new)
+    old_percentages = percentages(old_carparks.lots_available, old_carparks.total_lots)
+    new_percentages = percentages(new_carparks.lots_available, new_carparks.total_lots)
+
+    # Find the old position of every new carpark, -1 for added carparks
+    matches = array("q", map(old_carparks.slots.get, new_carparks.slots, repeat(-1)))
+
+    added = array("i")
+    changed = []
+    unchanged = 0
+    matched = bytearray(len(old_carparks.rows))
+    for (number, slot), old_slot in zip(new_carparks.slots.items(), matches):
+        if old_slot < 0:
+            added.append(new_carparks.rows[slot])
+            continue
+
+        matched[old_slot] = 1
+        old_total, new_total = old_carparks.total_lots[old_slot], new_carparks.total_lots[slot]
+        old_available, new_available = old_carparks.lots_available[old_slot], new_carparks.lots_available[slot]
+        if old_total == new_total and old_available == new_available:
+            unchanged += 1
+            continue
+
+        changed.append(CarparkChange(
+            number, new_carparks.rows[slot],
+            old_total, new_total, old_available, new_available,
+            old_percentages[old_slot], new_percentages[slot]
+        ))
+
+    # Old carparks no new carpark matched were removed
+    removed = array("i", (row for row, found in zip(old_carparks.rows, matched) if not found))
+
+    return SnapshotDiff(added, removed, changed, unchanged)
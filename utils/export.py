@@ -0,0 +1,213 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# export.py
+# In charge of exporting carpark data to ./res as CSV, JSON Lines
+# or a compact binary columnar format, one row at a time
+
+import csv
+import json
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterable, Iterator, TextIO, Tuple
+
+from utils.files import resource_path
+from utils.table import INT_COLUMNS, CarparkTable
+
+EXPORT_COLUMNS = ["Carpark Number", "Total Lots", "Lots Available", "Address"]
+EXPORT_FORMATS = ["csv", "jsonl", "bin"]
+SORT_KEYS = ["Lots Available", "Total Lots", "Percentage"]
+
+# Size of the write buffer, rows are flushed to disk whenever it fills up
+BUFFER_SIZE = 1 << 16
+
+# Binary format: every snapshot is a block starting with BLOCK_MAGIC and the
+# row count, followed by length-prefixed UTF-8 text and int32 column data,
+# all little-endian so exports can be read on any machine
+BLOCK_MAGIC = b"CPCB"
+_LENGTH = struct.Struct("<I")
+_SWAP_BYTES = sys.byteorder != "little"
+
+
+def export_filename(fmt: str) -> str:
+    """Gets the name of the file exports in the given format are written to
+
+    Args:
+        fmt (str): One of EXPORT_FORMATS
+
+    Returns:
+        str: The filename in ./res
+    """
+    return "carpark-availability-with-addresses." + fmt
+
+
+def sorted_rows(table: CarparkTable, sort_key: str, descending: bool = False) -> Iterable[int]:
+    """Orders the rows of a table by an already parsed numeric column
+
+    Args:
+        table (CarparkTable): The table to order
+        sort_key (str): Name of the numeric column to sort by
+        descending (bool): Whether to sort from the highest value
+
+    Returns:
+        Iterable[int]: The row indices in sorted order, equal values keep their row order
+    """
+
+    # Reuse the sorted index built when the data was loaded
+    index = table.sorted_indexes.get(sort_key)
+    if index is not None:
+        return index.descending() if descending else index.ascending()
+
+    column = table.column(sort_key)
+    if descending:
+        return sorted(range(len(table)), key=lambda i: -column[i])
+    return sorted(range(len(table)), key=column.__getitem__)
+
+
+def export_snapshots(
+        snapshots: Iterable[Tuple[str | None, CarparkTable]],
+        fmt: str = "csv",
+        sort_key: str = "Lots Available",
+        descending: bool = False,
+        filename: str | None = None
+) -> int:
+    """Streams one or more snapshots to a file in ./res through a buffered writer
+
+    CSV exports repeat the timestamp and header lines before each snapshot,
+    so a single snapshot produces the same file option 10 always has.
+
+    Examples:
+        ```py
+        export_snapshots([(timestamp, all_cp_info)])  # carpark-availability-with-addresses.csv
+        export_snapshots(get_history().linked(get_carpark_information()),
+                         fmt="jsonl", sort_key="Percentage", descending=True)
+        ```
+
+    Args:
+        snapshots (Iterable[Tuple[str | None, CarparkTable]]): Timestamp line, None if the
+        file had none, and data of every snapshot, may be a generator so the history
+        never has to be held in memory
+        fmt (str): One of EXPORT_FORMATS
+        sort_key (str): Name of the numeric column to sort each snapshot by
+        descending (bool): Whether to sort from the highest value
+        filename (str | None): File to write to, defaults to `export_filename(fmt)`
+
+    Returns:
+        int: Number of carpark rows written
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("Unknown export format: {}".format(fmt))
+
+    file_path = resource_path(filename or export_filename(fmt))
+
+    rows = 0
+    if fmt == "bin":
+        with open(file_path, "wb", buffering=BUFFER_SIZE) as f:
+            for timestamp, table in snapshots:
+                rows += _write_columnar(f, timestamp, table, sorted_rows(table, sort_key, descending))
+    else:
+        with open(file_path, "w", newline="", buffering=BUFFER_SIZE) as f:
+            write = _write_csv if fmt == "csv" else _write_jsonl
+            for timestamp, table in snapshots:
+                rows += write(f, timestamp, table, sorted_rows(table, sort_key, descending))
+
+    return rows
+
+
+def _write_csv(f: TextIO, timestamp: str | None, table: CarparkTable, order: Iterable[int]) -> int:
+    """Writes a snapshot as CSV lines, quoting addresses containing commas"""
+    if timestamp is not None:
+        f.write(timestamp + "\n")
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+
+    columns = [table.column(name) for name in EXPORT_COLUMNS]
+    rows = 0
+    for i in order:
+        writer.writerow([column[i] for column in columns])
+        rows += 1
+
+    return rows
+
+
+def _write_jsonl(f: TextIO, timestamp: str | None, table: CarparkTable, order: Iterable[int]) -> int:
+    """Writes a snapshot as one JSON object per line, with the timestamp in every object"""
+    if timestamp is not None:
+        timestamp = timestamp.removeprefix("Timestamp: ")
+    columns = [table.column(name) for name in EXPORT_COLUMNS]
+
+    rows = 0
+    for i in order:
+        record = {"Timestamp": timestamp}
+        for name, column in zip(EXPORT_COLUMNS, columns):
+            record[name] = column[i]
+
+        f.write(json.dumps(record))
+        f.write("\n")
+        rows += 1
+
+    return rows
+
+
+def _write_text(f: BinaryIO, text: str) -> None:
+    """Writes length-prefixed UTF-8 text"""
+    data = text.encode("utf-8")
+    f.write(_LENGTH.pack(len(data)))
+    f.write(data)
+
+
+def _write_columnar(f: BinaryIO, timestamp: str | None, table: CarparkTable, order: Iterable[int]) -> int:
+    """Writes a snapshot as a block of columns, text columns are newline-joined"""
+    order = array("i", order)
+
+    f.write(BLOCK_MAGIC)
+    f.write(_LENGTH.pack(len(order)))
+    _write_text(f, timestamp or "")
+
+    for name in EXPORT_COLUMNS:
+        column = table.column(name)
+        if name in INT_COLUMNS:
+            values = array("i", (column[i] for i in order))
+            if _SWAP_BYTES:
+                values.byteswap()
+            values.tofile(f)
+        else:
+            _write_text(f, "\n".join(column[i] for i in order))
+
+    return len(order)
+
+
+def load_columnar(filename: str) -> Iterator[Tuple[str, CarparkTable]]:
+    """Reads back the snapshots of a binary columnar export one at a time
+
+    Args:
+        filename (str): Name of the export in ./res
+
+    Returns:
+        Iterator[Tuple[str, CarparkTable]]: Timestamp line and data of every snapshot
+    """
+
+    def read_text(f: BinaryIO) -> str:
+        length, = _LENGTH.unpack(f.read(_LENGTH.size))
+        return f.read(length).decode("utf-8")
+
+    with open(resource_path(filename), "rb") as f:
+        while f.read(len(BLOCK_MAGIC)) == BLOCK_MAGIC:
+            length, = _LENGTH.unpack(f.read(_LENGTH.size))
+            timestamp = read_text(f)
+
+            columns = {}
+            for name in EXPORT_COLUMNS:
+                if name in INT_COLUMNS:
+                    column = array("i")
+                    column.fromfile(f, length)
+                    if _SWAP_BYTES:
+                        column.byteswap()
+                    columns[name] = column
+                else:
+                    text = read_text(f)
+                    columns[name] = text.split("\n") if length else []
+
+            yield timestamp, CarparkTable.from_columns(columns)
+
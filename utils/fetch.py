@@ -0,0 +1,212 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# fetch.py
+# Shared HTTP client for the realtime fetchers, reuses pooled connections
+# and skips downloading payloads that haven't changed
+
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+# Seconds to wait for a connection and for the response, overridable with
+# HTTP_CONNECT_TIMEOUT and HTTP_READ_TIMEOUT in the environment or .env
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10.0
+
+# Connections kept open per host
+POOL_SIZE = 10
+
+# Pages of a paged endpoint requested at the same time
+MAX_IN_FLIGHT = 4
+
+
+def get_timeout() -> Tuple[float, float]:
+    """Reads the timeouts when a request is made, as .env is only loaded
+    once realtime data is first needed
+
+    Returns:
+        Tuple[float, float]: Connect and read timeouts in seconds
+    """
+    return (float(os.getenv("HTTP_CONNECT_TIMEOUT", CONNECT_TIMEOUT)),
+            float(os.getenv("HTTP_READ_TIMEOUT", READ_TIMEOUT)))
+
+
+class FetchResult(NamedTuple):
+    """Decoded JSON of a response, and whether it changed since the last fetch"""
+    data: Any
+    modified: bool
+
+
+class FetchClient:
+    """HTTP client that keeps connections alive between requests,
+    decodes every response once and sends conditional requests
+
+    Responses with an ETag or Last-Modified header are remembered, later
+    requests for the same URL send them back and reuse the decoded JSON
+    when the server answers 304 Not Modified.
+
+    Examples:
+        ```py
+        client = FetchClient()
+        result = client.get_json("https://api.data.gov.sg/v1/transport/carpark-availability")
+        result.data["items"]  # Decoded JSON
+        result.modified  # False if the server answered 304
+        ```
+    """
+
+    def __init__(
+            self,
+            timeout: Tuple[float, float] | None = None,
+            pool_size: int = POOL_SIZE
+    ):
+        # None reads the timeouts from the environment on every request, see get_timeout
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = None
+
+        # Validators and decoded JSON of the last response, keyed by request
+        self.validators: Dict[tuple, Tuple[Dict[str, str], Any]] = {}
+        self.lock = threading.Lock()
+
+    def _get_session(self):
+        """Creates the pooled session on first use,
+        requests is imported here as it is slow to import"""
+        with self.lock:
+            if self.session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size,
+                                      pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.session = session
+
+        return self.session
+
+    def get_json(
+            self,
+            url: str,
+            headers: Dict[str, str] | None = None,
+            params: Dict[str, Any] | None = None
+    ) -> FetchResult:
+        """Fetches and decodes a JSON response
+
+        WARNING: Raises the exceptions of `requests` on connection errors,
+        timeouts and error statuses
+
+        Args:
+            url (str): The URL to fetch
+            headers (Dict[str, str] | None): Extra request headers
+            params (Dict[str, Any] | None): Query string parameters
+
+        Returns:
+            FetchResult: The decoded JSON, and whether it changed since the last fetch
+        """
+        session = self._get_session()
+        key = (url, tuple(sorted((params or {}).items())))
+        headers = dict(headers or {})
+
+        # Send the validators of the last response
+        with self.lock:
+            cached = self.validators.get(key)
+        if cached is not None:
+            headers.update(cached[0])
+
+        r = session.get(url, headers=headers, params=params, timeout=self.timeout or get_timeout())
+
+        # Reuse the decoded JSON if the payload hasn't changed
+        if r.status_code == 304 and cached is not None:
+            return FetchResult(cached[1], False)
+
+        r.raise_for_status()
+        data = r.json()
+
+        # Remember the validators for the next request
+        validators = {}
+        if "ETag" in r.headers:
+            validators["If-None-Match"] = r.headers["ETag"]
+        if "Last-Modified" in r.headers:
+            validators["If-Modified-Since"] = r.headers["Last-Modified"]
+
+        with self.lock:
+            if validators:
+                self.validators[key] = (validators, data)
+            else:
+                self.validators.pop(key, None)
+
+        return FetchResult(data, True)
+
+    def get_pages(
+            self,
+            url: str,
+            page_size: int,
+            headers: Dict[str, str] | None = None,
+            key: str = "value",
+            max_in_flight: int = MAX_IN_FLIGHT
+    ) -> Iterator[List[Any]]:
+        """Fetches every page of an OData endpoint paged with `$skip`,
+        with up to `max_in_flight` pages requested at the same time
+
+        Pages are yielded as they arrive, not in order. No pages past the
+        first short page are requested, as that page is the last one.
+
+        Examples:
+            ```py
+            for page in client.get_pages(LTA_URL, 500, headers={"AccountKey": api_key}):
+                records.extend(page)
+            ```
+
+        Args:
+            url (str): The URL of the endpoint
+            page_size (int): Number of records in a full page
+            headers (Dict[str, str] | None): Extra request headers
+            key (str): Key of the records in each page's JSON
+            max_in_flight (int): Most pages requested at the same time
+
+        Returns:
+            Iterator[List[Any]]: The records of each page
+        """
+
+        def fetch(skip: int) -> List[Any]:
+            return self.get_json(url, headers=headers, params={"$skip": skip}).data[key]
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            # Skip of the last page, known once a short page arrives
+            last_skip = None
+            next_skip = 0
+            pending = {}
+
+            def submit_next():
+                nonlocal next_skip
+                pending[pool.submit(fetch, next_skip)] = next_skip
+                next_skip += page_size
+
+            for _ in range(max_in_flight):
+                submit_next()
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    skip = pending.pop(future)
+                    page = future.result()
+
+                    # A short page is the last, pages after it are empty
+                    if len(page) < page_size and (last_skip is None or skip < last_skip):
+                        last_skip = skip
+                        for other, other_skip in list(pending.items()):
+                            if other_skip > last_skip and other.cancel():
+                                del pending[other]
+
+                    yield page
+
+                    # Keep the window full until the last page is known
+                    if last_skip is None:
+                        submit_next()
+
+
+# Client shared by every fetcher, so connections are reused between them
+client = FetchClient()
@@ -4,47 +4,149 @@
 # files.py
 # File to handle file I/O, in charge of parsing data in ./res
 
+import csv
 import os
-from typing import List
+import pickle
+from typing import Any, Callable, Dict, Iterator, Tuple
 
 RESOURCE_PATH = "./res"
 
 
-def load_file(filename: str) -> List[str] | None:
-    """Tries to read a file and returns its content in a list of strings
-    WARNING: Returns None if file is not found, never throws an exception
+def resource_path(filename: str) -> str:
+    """Gets the absolute path to a file in the ./res folder
 
     Args:
-        filename (str): Name of the file to read
+        filename (str): Name of the file
 
     Returns:
-        List[str] | None: Content of the file, None if file is not found
+        str: Absolute path to the file
     """
 
-    # Get absolute path to the file
     # WARN: Program must be started in directory containing main.py
     res_path = os.path.join(os.getcwd(), RESOURCE_PATH)
-    file_path = os.path.join(res_path, filename)
+    return os.path.join(res_path, filename)
 
-    with open(file_path) as f:
-        data = f.read()
 
-    return data.splitlines()
+def file_signature(filename: str) -> Tuple[int, int]:
+    """Gets the modification time and size of a file in the ./res folder,
+    used to tell when a cached copy of the file is out of date
 
+    Args:
+        filename (str): Name of the file
+
+    Returns:
+        Tuple[int, int]: Modification time in nanoseconds and size in bytes
+    """
+    stat = os.stat(resource_path(filename))
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CsvReader:
+    """Streams the rows of a CSV file in the ./res folder one at a time,
+    handling the `Timestamp:` line of availability files and quoted fields
+
+    Only the preamble and headers are read when the reader is created,
+    so the first rows are available before the rest of the file is read.
+
+    Examples:
+        ```py
+        with CsvReader("carpark-availability-v1.csv", {"Total Lots": int}) as reader:
+            print(reader.timestamp)  # Timestamp: 2023-06-19T11:10:27+08:00
+            for record in reader:
+                print(record["Carpark Number"], record["Total Lots"])
+        ```
+    """
+
+    def __init__(self, filename: str, converters: Dict[str, Callable[[str], Any]] | None = None):
+        """
+        Args:
+            filename (str): Name of the file to read
+            converters (Dict[str, Callable[[str], Any]] | None): Functions to convert
+            the values of a column, keyed by header
+        """
+        self.converters = converters or {}
+
+        # newline="" lets the csv module handle line breaks inside quotes
+        self.file = open(resource_path(filename), newline="")
+
+        # Read the optional timestamp line, then the headers
+        self.timestamp = None
+        first_line = self.file.readline()
+        if first_line.startswith("Timestamp:"):
+            self.timestamp = first_line.rstrip("\r\n")
+            first_line = self.file.readline()
+
+        self.headers = next(csv.reader([first_line]), [])
+        self.rows = csv.reader(self.file)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yields every remaining row as a dict keyed by header,
+        with the values of converted columns already typed"""
+        converters = [self.converters.get(header) for header in self.headers]
+
+        try:
+            for values in self.rows:
+                # Skip blank lines
+                if not values:
+                    continue
 
-def write_file(filename: str, content: str) -> None:
-    """Function to write data into a specified filename in the ./res folder
+                yield {
+                    header: value if convert is None else convert(value)
+                    for header, convert, value in zip(self.headers, converters, values)
+                }
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Closes the underlying file"""
+        self.file.close()
+
+    def __enter__(self) -> "CsvReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def load_cache(filename: str, signature: Any) -> Any | None:
+    """Loads an object cached with `write_cache`, if it is still valid
+    WARNING: Returns None if the cache is missing, unreadable or out of date
 
     Args:
-        filename (str): Name of the file to write to
-        content (str): Content to write to the file
+        filename (str): Name of the cache file
+        signature (Any): Signature the cache must have been written with
+
+    Returns:
+        Any | None: The cached object, None if it cannot be used
     """
+    try:
+        with open(resource_path(filename), "rb") as f:
+            cached_signature, data = pickle.load(f)
+    except Exception:
+        return None
 
-    # Get absolute path to the file
-    # WARN: Program must be started in directory containing main.py
-    res_path = os.path.join(os.getcwd(), RESOURCE_PATH)
-    file_path = os.path.join(res_path, filename)
+    # Discard caches written for a different version of the source file
+    if cached_signature != signature:
+        return None
+
+    return data
+
+
+def write_cache(filename: str, signature: Any, data: Any) -> None:
+    """Writes an object to a cache file in the ./res folder, together with
+    the signature of the data it was built from
+
+    Args:
+        filename (str): Name of the cache file
+        signature (Any): Signature of the source data, checked by `load_cache`
+        data (Any): Object to cache
+    """
+    file_path = resource_path(filename)
 
-    # Write content to the file
-    with open(file_path, "w") as f:
-        f.write(content)
+    # Write to a temporary file first so a crash never leaves a partial cache
+    try:
+        with open(file_path + ".tmp", "wb") as f:
+            pickle.dump((signature, data), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(file_path + ".tmp", file_path)
+    except OSError:
+        pass
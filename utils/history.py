@@ -0,0 +1,420 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# history.py
+# Append-only store of carpark availability snapshots in ./res,
+# so availability can be queried over time
+
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Dict, Iterator, List, Tuple
+
+# File locking differs between POSIX and Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from utils.carpark import associate_carpark_info
+from utils.files import resource_path
+from utils.table import CarparkTable
+
+HISTORY_NAME = "availability-history"
+
+# Snapshots are of carparks in Singapore, so times are written in Singapore time
+TIMEZONE = timezone(timedelta(hours=8))
+
+# Index records: snapshot time in epoch seconds, block offset and block length
+_INDEX_RECORD = struct.Struct("<qQI")
+
+# Block header: number of carparks in the snapshot, and the array typecode
+# of the lot columns, 16-bit whenever the lot counts fit
+_BLOCK_HEADER = struct.Struct("<Ic")
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Holds an exclusive lock on a file, shared by every process using the store,
+    blocking until other processes release it
+
+    Args:
+        path (str): The lock file, created if missing
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def parse_timestamp(timestamp: str | int) -> int:
+    """Converts a timestamp line or ISO 8601 time to epoch seconds
+
+    Args:
+        timestamp (str | int): e.g. "Timestamp: 2023-06-19T11:10:27+08:00",
+        epoch seconds are returned unchanged
+
+    Returns:
+        int: Seconds since the epoch
+    """
+    if isinstance(timestamp, int):
+        return timestamp
+
+    timestamp = timestamp.removeprefix("Timestamp:").strip()
+    return int(datetime.fromisoformat(timestamp).timestamp())
+
+
+def format_timestamp(time: int) -> str:
+    """Converts epoch seconds back to a timestamp line, the reverse of `parse_timestamp`
+
+    Args:
+        time (int): Seconds since the epoch
+
+    Returns:
+        str: e.g. "Timestamp: 2023-06-19T11:10:27+08:00"
+    """
+    return "Timestamp: " + datetime.fromtimestamp(time, TIMEZONE).isoformat()
+
+
+class HistoryStore:
+    """Append-only store of availability snapshots
+
+    Carpark numbers are dictionary-encoded into integer ids kept in a `.dict`
+    file. Each snapshot is one zlib-compressed block in the `.bin` file holding
+    its carpark ids, sorted and delta-encoded, and its Total Lots and
+    Lots Available columns. A `.idx` file maps snapshot times to blocks, so
+    range queries only read the blocks they need.
+
+    Several sessions may append at once. Appends hold an exclusive lock on the
+    `.lock` file and first read what other sessions added, so ids and offsets
+    never depend on what this process read when it opened the store.
+
+    Examples:
+        ```py
+        store = HistoryStore()
+        store.append(timestamp, all_cp_info)
+
+        store.series("HE12")  # [(1687144227, 105, 41), ...]
+        for time, snapshot in store.range("2023-06-19T00:00:00+08:00", "2023-06-20T00:00:00+08:00"):
+            print(time, len(snapshot))
+
+        # Linked snapshots can be exported like the files read in option 3
+        export_snapshots(store.linked(get_carpark_information()), fmt="jsonl")
+        ```
+    """
+
+    def __init__(self, name: str = HISTORY_NAME):
+        self.dict_path = resource_path(name + ".dict")
+        self.bin_path = resource_path(name + ".bin")
+        self.index_path = resource_path(name + ".idx")
+        self.lock_path = resource_path(name + ".lock")
+        self.lock = threading.Lock()
+
+        # Carpark numbers by id, and ids by carpark number
+        self.numbers: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+        # Index sorted by time
+        self.times = array("q")
+        self.blocks: List[Tuple[int, int]] = []
+
+        # Bytes of the dictionary and index files read so far
+        self.dict_size = 0
+        self.index_size = 0
+
+        self._reload()
+
+    def _reload(self) -> None:
+        """Reads what other processes appended to the dictionary and index files
+        since they were last read, skipping a partly written last line or record"""
+        if os.path.exists(self.dict_path):
+            with open(self.dict_path, "rb") as f:
+                f.seek(self.dict_size)
+                data = f.read()
+
+            # Only read up to the last complete line
+            data = data[:data.rfind(b"\n") + 1]
+            for number in data.decode("utf-8").splitlines():
+                self.ids[number] = len(self.numbers)
+                self.numbers.append(number)
+            self.dict_size += len(data)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                f.seek(self.index_size)
+                data = f.read()
+
+            # Ignore records of blocks that were never fully written
+            data = data[:len(data) - len(data) % _INDEX_RECORD.size]
+            bin_size = os.path.getsize(self.bin_path) if os.path.exists(self.bin_path) else 0
+            for time, offset, length in _INDEX_RECORD.iter_unpack(data):
+                if offset + length <= bin_size:
+                    i = bisect_right(self.times, time)
+                    self.times.insert(i, time)
+                    self.blocks.insert(i, (offset, length))
+            self.index_size += len(data)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __contains__(self, timestamp: str | int) -> bool:
+        time = parse_timestamp(timestamp)
+        i = bisect_left(self.times, time)
+        return i < len(self.times) and self.times[i] == time
+
+    def append(self, timestamp: str | int, table: CarparkTable) -> bool:
+        """Appends a snapshot, snapshots already stored are skipped
+
+        Args:
+            timestamp (str | int): Time of the snapshot, see `parse_timestamp`
+            table (CarparkTable): The snapshot, with Carpark Number,
+            Total Lots and Lots Available columns
+
+        Returns:
+            bool: Whether the snapshot was appended
+        """
+        time = parse_timestamp(timestamp)
+
+        # Other sessions append to the same files, so hold the file lock for the
+        # whole append and catch up on what they wrote before assigning new ids
+        with self.lock, _file_lock(self.lock_path):
+            self._reload()
+            if timestamp in self:
+                return False
+
+            # Dictionary-encode the carpark numbers, adding new ones to the dictionary
+            new_numbers = []
+            row_ids = []
+            for number in table.column("Carpark Number"):
+                carpark_id = self.ids.get(number)
+                if carpark_id is None:
+                    carpark_id = self.ids[number] = len(self.numbers)
+                    self.numbers.append(number)
+                    new_numbers.append(number)
+                row_ids.append(carpark_id)
+
+            # Sort the rows by id and delta-encode the ids, feeds can list
+            # a carpark more than once so the deltas may be zero
+            order = sorted(range(len(row_ids)), key=row_ids.__getitem__)
+            ids = [row_ids[row] for row in order]
+            deltas = array("I", (b - a for a, b in zip([0] + ids, ids)))
+            total_lots = table.column("Total Lots")
+            lots_available = table.column("Lots Available")
+            totals = [total_lots[row] for row in order]
+            available = [lots_available[row] for row in order]
+
+            typecode = "H" if all(0 <= lots < 1 << 16 for lots in totals + available) else "i"
+            block = zlib.compress(_BLOCK_HEADER.pack(len(ids), typecode.encode())
+                                  + deltas.tobytes() + array(typecode, totals).tobytes()
+                                  + array(typecode, available).tobytes())
+
+            # Write the dictionary and block before the index record pointing to them,
+            # cutting off anything left partly written by a session that crashed
+            dict_line = "".join(number + "\n" for number in new_numbers).encode("utf-8")
+            with open(self.dict_path, "ab") as f:
+                f.truncate(self.dict_size)
+                f.write(dict_line)
+            self.dict_size += len(dict_line)
+
+            with open(self.bin_path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(block)
+
+            with open(self.index_path, "ab") as f:
+                f.truncate(self.index_size)
+                f.write(_INDEX_RECORD.pack(time, offset, len(block)))
+            self.index_size += _INDEX_RECORD.size
+
+            i = bisect_right(self.times, time)
+            self.times.insert(i, time)
+            self.blocks.insert(i, (offset, len(block)))
+
+        return True
+
+    def _read_block(self, f, i: int) -> Tuple[array, array, array]:
+        """Reads and decodes the i-th block in time order
+
+        Raises:
+            ValueError: If the block can't be decoded
+
+        Returns:
+            Tuple[array, array, array]: Carpark ids, Total Lots and Lots Available
+        """
+        offset, length = self.blocks[i]
+        f.seek(offset)
+        try:
+            data = zlib.decompress(f.read(length))
+            count, typecode = _BLOCK_HEADER.unpack_from(data)
+            typecode = typecode.decode()
+        except (zlib.error, struct.error, UnicodeDecodeError) as e:
+            raise ValueError("Corrupt history block at offset {}".format(offset)) from e
+
+        columns = []
+        start = _BLOCK_HEADER.size
+        for column_typecode in ("I", typecode, typecode):
+            column = array(column_typecode)
+            column.frombytes(data[start:start + count * column.itemsize])
+            columns.append(column)
+            start += count * column.itemsize
+
+        # Undo the delta encoding of the ids
+        ids = array("I", accumulate(columns[0]))
+
+        return ids, array("i", columns[1]), array("i", columns[2])
+
+    def _block_range(self, start: str | int | None, end: str | int | None) -> range:
+        """Finds the blocks of the snapshots between start and end, both inclusive"""
+        first = 0 if start is None else bisect_left(self.times, parse_timestamp(start))
+        last = len(self.times) if end is None else bisect_right(self.times, parse_timestamp(end))
+        return range(first, last)
+
+    def range(
+            self,
+            start: str | int | None = None,
+            end: str | int | None = None
+    ) -> Iterator[Tuple[int, CarparkTable]]:
+        """Reads every snapshot between start and end, both inclusive
+
+        Args:
+            start (str | int | None): Earliest time to include, None for the first snapshot
+            end (str | int | None): Latest time to include, None for the last snapshot
+
+        Returns:
+            Iterator[Tuple[int, CarparkTable]]: Time in epoch seconds and data of every snapshot
+        """
+        blocks = self._block_range(start, end)
+        if len(blocks) == 0:
+            return
+
+        with open(self.bin_path, "rb") as f:
+            for i in blocks:
+                ids, totals, available = self._read_block(f, i)
+                yield self.times[i], CarparkTable.from_columns({
+                    "Carpark Number": [self.numbers[carpark_id] for carpark_id in ids],
+                    "Total Lots": totals,
+                    "Lots Available": available,
+                })
+
+    def linked(
+            self,
+            carpark_info: CarparkTable,
+            start: str | int | None = None,
+            end: str | int | None = None,
+            locations: Dict[str, Tuple[float, float]] | None = None
+    ) -> Iterator[Tuple[str, CarparkTable]]:
+        """Reads every snapshot between start and end, both inclusive, linked with
+        the carpark information, one at a time
+
+        Args:
+            carpark_info (CarparkTable): The carpark information
+            start (str | int | None): Earliest time to include, None for the first snapshot
+            end (str | int | None): Latest time to include, None for the last snapshot
+            locations (Dict[str, Tuple[float, float]] | None): Carpark locations
+            to add, None to leave them out
+
+        Returns:
+            Iterator[Tuple[str, CarparkTable]]: Timestamp line and linked data of every
+            snapshot, as `load_carpark_availability` and `associate_carpark_info` give
+        """
+        for time, table in self.range(start, end):
+            yield format_timestamp(time), associate_carpark_info(table, carpark_info, locations=locations)
+
+    def before(self, timestamp: str | int) -> Tuple[int, CarparkTable] | None:
+        """Reads the latest snapshot taken before a time
+
+        Args:
+            timestamp (str | int): The time, see `parse_timestamp`
+
+        Returns:
+            Tuple[int, CarparkTable] | None: Time in epoch seconds and data of the
+            snapshot, None if no earlier snapshot is stored
+        """
+        i = bisect_left(self.times, parse_timestamp(timestamp)) - 1
+        if i < 0:
+            return None
+        return next(self.range(self.times[i], self.times[i]))
+
+    def series(
+            self,
+            carpark_number: str,
+            start: str | int | None = None,
+            end: str | int | None = None
+    ) -> List[Tuple[int, int, int]]:
+        """Reads the availability of one carpark between start and end, both inclusive
+
+        Args:
+            carpark_number (str): The carpark to read
+            start (str | int | None): Earliest time to include, None for the first snapshot
+            end (str | int | None): Latest time to include, None for the last snapshot
+
+        Returns:
+            List[Tuple[int, int, int]]: Time in epoch seconds, Total Lots and Lots Available
+            of every row of the carpark in the snapshots
+        """
+        carpark_id = self.ids.get(carpark_number)
+        blocks = self._block_range(start, end)
+        if carpark_id is None or len(blocks) == 0:
+            return []
+
+        series = []
+        with open(self.bin_path, "rb") as f:
+            for i in blocks:
+                ids, totals, available = self._read_block(f, i)
+
+                # Ids are sorted, so the carpark's rows can be found by binary search
+                for j in range(bisect_left(ids, carpark_id), bisect_right(ids, carpark_id)):
+                    series.append((self.times[i], totals[j], available[j]))
+
+        return series
+
+
+# Store shared by the menu options and the map
+history: HistoryStore | None = None
+
+
+def get_history() -> HistoryStore:
+    """Opens the shared history store on first use
+
+    Returns:
+        HistoryStore: The store in ./res
+    """
+    global history
+
+    if history is None:
+        history = HistoryStore()
+    return history
+
+
+def record_snapshot(timestamp: str, table: CarparkTable) -> bool:
+    """Appends a loaded snapshot to the shared history store,
+    snapshots that cannot be stored are skipped silently
+
+    Args:
+        timestamp (str): The snapshot's timestamp line
+        table (CarparkTable): The snapshot
+
+    Returns:
+        bool: Whether the snapshot was appended
+    """
+    try:
+        return get_history().append(timestamp, table)
+    except (OSError, ValueError):
+        return False
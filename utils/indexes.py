@@ -0,0 +1,160 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# indexes.py
+# Indexes over CarparkTable columns, used to answer searches without
+# scanning every carpark
+
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Dict, Iterator, List, Sequence, Set
+
+# Length of the n-grams used by TrigramIndex
+GRAM_SIZE = 3
+
+
+def _grams(text: str) -> Set[str]:
+    """Splits text into its distinct n-grams
+
+    Args:
+        text (str): The text to split
+
+    Returns:
+        Set[str]: Every substring of length GRAM_SIZE in the text
+    """
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class TrigramIndex:
+    """Inverted index from every trigram to the rows containing it,
+    used for substring searches over a text column
+
+    Examples:
+        ```py
+        index = TrigramIndex(["BLK 101 JALAN DUSUN", "BLK 98A ALJUNIED CRESCENT"])
+        index.search("DUSUN")  # [0]
+        ```
+    """
+
+    def __init__(self, values: List[str]):
+        self.values = values
+        self.postings: Dict[str, array] = {}
+
+        # Joined columns repeat the same few values, so group the rows by
+        # value and split each value into its n-grams once
+        value_rows: Dict[str, array] = {}
+        for i, value in enumerate(values):
+            rows = value_rows.get(value)
+            if rows is None:
+                rows = value_rows[value] = array("i")
+            rows.append(i)
+
+        gram_rows: Dict[str, List[array]] = {}
+        for value, rows in value_rows.items():
+            for gram in _grams(value):
+                gram_rows.setdefault(gram, []).append(rows)
+
+        # Merge the rows of every value containing the n-gram into one sorted posting list
+        for gram, parts in gram_rows.items():
+            if len(parts) == 1:
+                self.postings[gram] = parts[0]
+            else:
+                self.postings[gram] = array("i", sorted(chain.from_iterable(parts)))
+
+    def search(self, query: str) -> List[int]:
+        """Finds the rows whose value contains the query
+
+        Args:
+            query (str): The substring to search for
+
+        Returns:
+            List[int]: Indices of the matching rows, in ascending order
+        """
+
+        # Queries too short to have a trigram are checked against every row
+        if len(query) < GRAM_SIZE:
+            return [i for i, value in enumerate(self.values) if query in value]
+
+        # Intersect the posting lists, starting from the shortest
+        postings = []
+        for gram in _grams(query):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+
+        # Trigrams can match out of order, so confirm each candidate
+        return sorted(i for i in candidates if query in self.values[i])
+
+
+class SortedIndex:
+    """Row indices of a numeric column sorted by value, so range queries
+    become two binary searches and a slice
+
+    Examples:
+        ```py
+        index = SortedIndex(array("d", [80.0, 10.0, 50.0]))
+        index.between(25, None)  # array('i', [2, 0])
+        index.count(25, 75)  # 1
+        ```
+    """
+
+    def __init__(self, values: Sequence[int | float]):
+        self.order = array("i", sorted(range(len(values)), key=values.__getitem__))
+        self.keys = array("d", (values[i] for i in self.order))
+
+    def _bounds(self, low: float | None, high: float | None) -> tuple[int, int]:
+        """Finds the positions in `order` of the first and past-the-last
+        values within `low` and `high`, both inclusive"""
+        start = 0 if low is None else bisect_left(self.keys, low)
+        stop = len(self.keys) if high is None else bisect_right(self.keys, high)
+        return start, max(start, stop)
+
+    def between(self, low: float | None = None, high: float | None = None) -> array:
+        """Finds the rows with values between `low` and `high`, both inclusive
+
+        Args:
+            low (float | None): Lowest value to include, None for no lower bound
+            high (float | None): Highest value to include, None for no upper bound
+
+        Returns:
+            array: Indices of the matching rows, in ascending order of value
+        """
+        start, stop = self._bounds(low, high)
+        return self.order[start:stop]
+
+    def count(self, low: float | None = None, high: float | None = None) -> int:
+        """Counts the rows with values between `low` and `high`, both inclusive
+
+        Args:
+            low (float | None): Lowest value to include, None for no lower bound
+            high (float | None): Highest value to include, None for no upper bound
+
+        Returns:
+            int: Number of matching rows
+        """
+        start, stop = self._bounds(low, high)
+        return stop - start
+
+    def ascending(self) -> Iterator[int]:
+        """Yields the rows from the lowest value to the highest,
+        rows with equal values are yielded in row order"""
+        yield from self.order
+
+    def descending(self) -> Iterator[int]:
+        """Yields the rows from the highest value to the lowest,
+        rows with equal values are yielded in row order"""
+        stop = len(self.keys)
+        while stop > 0:
+            # Find the start of the run of equal values ending at `stop`
+            start = bisect_left(self.keys, self.keys[stop - 1], 0, stop)
+            yield from self.order[start:stop]
+            stop = start
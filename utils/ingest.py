@@ -0,0 +1,303 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# ingest.py
+# Parses many availability snapshot files, or one very large file, at once
+# in worker processes, and merges the results
+
+import csv
+import mmap
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+from utils.carpark import associate_carpark_info, load_carpark_availability
+from utils.files import resource_path
+from utils.table import INT_COLUMNS, CarparkTable
+
+# Columns kept from every snapshot file
+SNAPSHOT_COLUMNS = ["Carpark Number", "Total Lots", "Lots Available"]
+
+# Files handed to a worker at a time, so small files don't cost a round trip each
+CHUNK_SIZE = 4
+
+# Files smaller than this are parsed in one piece, in this process
+MIN_SPLIT_BYTES = 4 << 20
+
+# Compact form of a parsed file: timestamp line, carpark numbers joined by
+# newlines, and the lot columns as raw int array bytes
+PackedSnapshot = Tuple[str, str, Dict[str, bytes]]
+
+
+def _parse_packed(filename: str) -> PackedSnapshot:
+    """Parses a snapshot file into its compact form, runs in a worker process
+
+    Carpark numbers are sent as one string and lot counts as array bytes,
+    which pickle far smaller and faster than a list of rows.
+    """
+    timestamp, table = load_carpark_availability(filename)
+    numbers = "\n".join(table.column("Carpark Number"))
+    lots = {name: table.column(name).tobytes() for name in INT_COLUMNS}
+    return timestamp, numbers, lots
+
+
+class SnapshotSet:
+    """Many availability snapshots stored back to back in one table
+
+    The rows of each snapshot are contiguous, `offsets[i]:offsets[i + 1]` are the
+    rows of the i-th snapshot. Carpark numbers are interned, so repeated numbers
+    across snapshots share one string.
+
+    Examples:
+        ```py
+        snapshots = load_snapshots(["carpark-availability-v1.csv", "carpark-availability-v2.csv"])
+        timestamp, table = snapshots[1]
+
+        # Linked snapshots iterate as (timestamp, table), like the history
+        export_snapshots(snapshots.linked(get_carpark_information()), fmt="jsonl")
+        ```
+    """
+
+    def __init__(self):
+        self.filenames: List[str] = []
+        self.timestamps: List[str] = []
+        self.offsets = array("q", [0])
+        self.table = CarparkTable(SNAPSHOT_COLUMNS)
+
+    def add_packed(self, filename: str, packed: PackedSnapshot) -> None:
+        """Appends a snapshot in the compact form made by the workers
+
+        Args:
+            filename (str): The file the snapshot was parsed from
+            packed (PackedSnapshot): The parsed snapshot
+        """
+        timestamp, numbers, lots = packed
+
+        # Append the packed bytes straight onto the int columns
+        added = 0
+        for name, data in lots.items():
+            column = self.table.column(name)
+            size = len(column)
+            column.frombytes(data)
+            added = len(column) - size
+
+        if added:
+            self.table.column("Carpark Number").extend(map(sys.intern, numbers.split("\n")))
+
+        self.filenames.append(filename)
+        self.timestamps.append(timestamp)
+        self.offsets.append(self.offsets[-1] + added)
+
+    def add_table(self, filename: str, timestamp: str, table: CarparkTable) -> None:
+        """Appends an already parsed snapshot
+
+        Args:
+            filename (str): The file the snapshot was parsed from
+            timestamp (str): The snapshot's timestamp line
+            table (CarparkTable): The parsed snapshot
+        """
+        for name in SNAPSHOT_COLUMNS:
+            self.table.column(name).extend(table.column(name))
+
+        self.filenames.append(filename)
+        self.timestamps.append(timestamp)
+        self.offsets.append(self.offsets[-1] + len(table))
+
+    def rows(self, i: int) -> range:
+        """Gets the rows of the i-th snapshot in `table`"""
+        return range(self.offsets[i], self.offsets[i + 1])
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, i: int) -> Tuple[str, CarparkTable]:
+        """Gets the timestamp and a table of the i-th snapshot"""
+        if i < 0:
+            i += len(self)
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.timestamps[i], CarparkTable.from_columns({
+            name: self.table.column(name)[start:stop] for name in SNAPSHOT_COLUMNS
+        })
+
+    def __iter__(self) -> Iterator[Tuple[str, CarparkTable]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def linked(
+            self,
+            carpark_info: CarparkTable,
+            locations: Dict[str, Tuple[float, float]] | None = None
+    ) -> Iterator[Tuple[str, CarparkTable]]:
+        """Links every snapshot with the carpark information, one at a time,
+        so only one linked snapshot is held in memory
+
+        Args:
+            carpark_info (CarparkTable): The carpark information
+            locations (Dict[str, Tuple[float, float]] | None): Carpark locations
+            to add, None to leave them out
+
+        Returns:
+            Iterator[Tuple[str, CarparkTable]]: Timestamp and linked data of every snapshot
+        """
+        for timestamp, table in self:
+            yield timestamp, associate_carpark_info(table, carpark_info, locations=locations)
+
+
+def load_snapshots(filenames: List[str], max_workers: int | None = None) -> SnapshotSet:
+    """Parses availability files in a pool of worker processes, and merges them
+    into one dataset in the order given
+
+    With a single worker every file is parsed in this process, as starting the
+    pool would cost more than it saves. A single file is parsed with `parse_large_file`.
+
+    Workers are forked on Linux, so call this before starting any threads,
+    a thread holding a lock while forking can leave the workers deadlocked.
+
+    Args:
+        filenames (List[str]): Names of the files in ./res, or absolute paths
+        max_workers (int | None): Most worker processes, None for one per core
+
+    Returns:
+        SnapshotSet: The snapshots of every file
+    """
+    snapshots = SnapshotSet()
+    workers = min(max_workers or os.cpu_count() or 1, len(filenames))
+
+    # A single file is split between the workers instead
+    if len(filenames) == 1:
+        snapshots.add_table(filenames[0], *parse_large_file(filenames[0], max_workers))
+        return snapshots
+
+    if workers <= 1:
+        for filename in filenames:
+            snapshots.add_packed(filename, _parse_packed(filename))
+        return snapshots
+
+    # Workers start in the same directory, so names in ./res resolve the same way
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for filename, packed in zip(filenames, pool.map(_parse_packed, filenames, chunksize=CHUNK_SIZE)):
+            snapshots.add_packed(filename, packed)
+
+    return snapshots
+
+
+def _parse_range(path: str, start: int, stop: int, headers: List[str]) -> Tuple[int, Dict[str, str | bytes]]:
+    """Parses the lines between two byte offsets of a file, runs in a worker process
+
+    The file is memory-mapped, so every worker reads its own range from the
+    page cache and the input is never copied between processes.
+
+    Returns:
+        Tuple[int, Dict[str, str | bytes]]: Number of rows, then text columns joined
+        by newlines and int columns as raw array bytes, keyed by header
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:stop].decode()
+
+    # Skip blank lines
+    rows = [values for values in csv.reader(text.splitlines()) if values]
+
+    columns = {}
+    for i, header in enumerate(headers):
+        values = [row[i] for row in rows]
+        if header in INT_COLUMNS:
+            columns[header] = array("i", map(int, values)).tobytes()
+        else:
+            columns[header] = "\n".join(values)
+
+    return len(rows), columns
+
+
+def split_lines(mm: mmap.mmap, start: int, parts: int) -> List[Tuple[int, int]]:
+    """Splits the bytes from `start` to the end into ranges ending on line boundaries
+
+    Args:
+        mm (mmap.mmap): The mapped file
+        start (int): Offset of the first line to include
+        parts (int): Number of ranges to aim for, fewer are returned for short files
+
+    Returns:
+        List[Tuple[int, int]]: Start and stop offset of every range, in order
+    """
+    size = len(mm)
+    step = max((size - start) // parts, 1)
+
+    ranges = []
+    while start < size:
+        # Extend the range to the end of the line it stops in
+        stop = mm.find(b"\n", min(start + step, size) - 1)
+        stop = size if stop == -1 else stop + 1
+        ranges.append((start, stop))
+        start = stop
+
+    return ranges
+
+
+def parse_large_file(
+        filename: str,
+        max_workers: int | None = None,
+        min_split_bytes: int = MIN_SPLIT_BYTES
+) -> Tuple[str | None, CarparkTable]:
+    """Parses one availability file by splitting it into line-aligned byte ranges,
+    parsing the ranges in worker processes and joining the columns in order
+
+    Gives the same result as `load_carpark_availability`, for files whose
+    fields don't contain line breaks, which availability files never do.
+
+    Examples:
+        ```py
+        timestamp, table = parse_large_file("national-availability.csv")
+        ```
+
+    Args:
+        filename (str): Name of the file in ./res, or an absolute path
+        max_workers (int | None): Most worker processes, None for one per core
+        min_split_bytes (int): Files smaller than this are parsed in this process
+
+    Returns:
+        Tuple[str | None, CarparkTable]: The file's timestamp line and its parsed data
+    """
+    path = resource_path(filename)
+
+    # Read the optional timestamp line, then the headers
+    with open(path, "rb") as f:
+        timestamp = None
+        first_line = f.readline()
+        if first_line.startswith(b"Timestamp:"):
+            timestamp = first_line.decode().rstrip("\r\n")
+            first_line = f.readline()
+
+        headers = next(csv.reader([first_line.decode()]), [])
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+
+        # Aim for a few ranges per worker, so an uneven range doesn't hold the rest up
+        workers = max_workers or os.cpu_count() or 1
+        if size - start < min_split_bytes or workers <= 1:
+            ranges = [(start, size)] if start < size else []
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                ranges = split_lines(mm, start, workers * 4)
+
+    # Parse the ranges, in this process if there is only one
+    if len(ranges) <= 1:
+        parts = [_parse_range(path, *part, headers) for part in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            parts = list(pool.map(_parse_range, *zip(*((path, *part, headers) for part in ranges))))
+
+    # Join the partial columns in file order
+    table = CarparkTable(headers)
+    for count, columns in parts:
+        if count == 0:
+            continue
+
+        for header, values in columns.items():
+            if header in INT_COLUMNS:
+                table.column(header).frombytes(values)
+            else:
+                table.column(header).extend(map(sys.intern, values.split("\n")))
+
+    return timestamp, table
@@ -0,0 +1,122 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# loader.py
+# Runs slow loading work on a worker thread, handing its progress and
+# result back to the Tkinter main loop so the window never freezes
+
+import queue
+import threading
+from typing import Any, Callable
+
+# Milliseconds between checks for messages from the worker
+POLL_MS = 100
+
+
+class LoadCancelled(Exception):
+    """Raised inside a job when its progress is reported after it was cancelled"""
+
+
+class BackgroundLoader:
+    """Runs a job on a daemon thread, and calls back on the Tkinter main loop
+
+    The job is given a `report` function to describe its progress. Messages
+    pass through a queue polled with `after()`, so every callback runs on the
+    main thread and may update widgets. Once cancelled, `report` raises
+    LoadCancelled to stop the job at its next step, and no callbacks are made.
+
+    Examples:
+        ```py
+        def job(report):
+            report("Loading carpark information")
+            return get_carpark_information()
+
+        loader = BackgroundLoader(frame, job, on_progress=status.set, on_done=show)
+        loader.start()
+        ```
+    """
+
+    def __init__(
+            self,
+            widget,
+            job: Callable[[Callable[[str], None]], Any],
+            on_progress: Callable[[str], None] | None = None,
+            on_done: Callable[[Any], None] | None = None,
+            on_error: Callable[[Exception], None] | None = None,
+            poll_ms: int = POLL_MS
+    ):
+        """
+        Args:
+            widget (tk.Misc): Widget used to schedule the polling, polling stops
+            once it is destroyed
+            job (Callable[[Callable[[str], None]], Any]): The work, given a function
+            to report its progress with
+            on_progress (Callable[[str], None] | None): Called with each progress message
+            on_done (Callable[[Any], None] | None): Called with the job's result
+            on_error (Callable[[Exception], None] | None): Called with the exception
+            the job raised
+            poll_ms (int): Milliseconds between checks for messages
+        """
+        self.widget = widget
+        self.job = job
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+
+        self.messages: queue.Queue = queue.Queue()
+        self.cancelled = threading.Event()
+        self.finished = False
+
+    def start(self) -> None:
+        """Starts the job, and polling for its messages"""
+        threading.Thread(target=self._run, daemon=True).start()
+        self.widget.after(self.poll_ms, self._poll)
+
+    def cancel(self) -> None:
+        """Cancels the job, it stops at its next report and its result is dropped"""
+        self.cancelled.set()
+
+    def report(self, message: str) -> None:
+        """Passes a progress message to the main loop, called by the job
+
+        Raises:
+            LoadCancelled: If the loader has been cancelled
+        """
+        if self.cancelled.is_set():
+            raise LoadCancelled()
+        self.messages.put(("progress", message))
+
+    def _run(self) -> None:
+        try:
+            result = self.job(self.report)
+        except LoadCancelled:
+            return
+        except Exception as e:
+            self.messages.put(("error", e))
+        else:
+            self.messages.put(("done", result))
+
+    def _poll(self) -> None:
+        """Hands the worker's messages to the callbacks, on the main thread"""
+
+        # Stop once cancelled, or once the window has been closed
+        if self.cancelled.is_set() or not self.widget.winfo_exists():
+            self.cancel()
+            return
+
+        while True:
+            try:
+                kind, value = self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            callback = {"progress": self.on_progress, "done": self.on_done,
+                        "error": self.on_error}[kind]
+            if kind != "progress":
+                self.finished = True
+            if callback is not None:
+                callback(value)
+
+        if not self.finished:
+            self.widget.after(self.poll_ms, self._poll)
@@ -0,0 +1,336 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# markers.py
+# Keeps the markers on a TkinterMapView in sync with the carparks to show,
+# only touching the markers that changed, and clusters them by zoom level
+
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from utils.spatial import Bounds, Cluster, QuadTree, from_mercator, to_mercator
+from utils.table import CarparkRow
+from utils.vectorized import BUCKET_THRESHOLDS
+
+# Marker colours (inner, outer) for each availability bucket
+BUCKET_COLORS = [
+    ("#FF0000", "#8B0000"),  # Red, 25% or less available
+    ("#FFFF00", "#FFA500"),  # Yellow, more than 25% available
+    ("#00FF00", "#006400"),  # Green, more than 75% available
+]
+
+# Clusters are quadtree cells this many levels below the zoom,
+# 2 levels make them 64 pixels wide
+CLUSTER_DEPTH_OFFSET = 2
+
+# Zoom from which every carpark gets its own marker
+MAX_CLUSTER_ZOOM = 16
+
+# Pixels around the viewport whose markers are drawn too, so markers
+# partly inside the map don't pop in while panning
+VIEWPORT_MARGIN = 64
+
+# Milliseconds between recomputing the markers while the map moves
+REFRESH_MS = 100
+
+
+def availability_bucket(percentage: float) -> int:
+    """Gets the availability bucket of a carpark, which decides its marker colour
+
+    Args:
+        percentage (float): Percentage of lots available
+
+    Returns:
+        int: Index into BUCKET_COLORS
+    """
+    low, high = BUCKET_THRESHOLDS
+    if percentage > high:
+        return 2
+    if percentage > low:
+        return 1
+    return 0
+
+
+def fit_points(map_widget, points: List[Tuple[float, float]], max_zoom: int = MAX_CLUSTER_ZOOM) -> None:
+    """Centres the map on some points, at the highest zoom that shows all of them
+
+    Args:
+        map_widget (tk_map.TkinterMapView): The map
+        points (List[Tuple[float, float]]): Latitude and longitude of every point
+        max_zoom (int): Highest zoom to use, e.g. for a single point
+    """
+    if not points:
+        return
+
+    xs, ys = zip(*(to_mercator(*point) for point in points))
+
+    # Size of the points in pixels at zoom 0, leaving room for the markers
+    width = (max(xs) - min(xs)) * map_widget.tile_size
+    height = (max(ys) - min(ys)) * map_widget.tile_size
+    room_x = max(map_widget.width - 2 * VIEWPORT_MARGIN, 1)
+    room_y = max(map_widget.height - 2 * VIEWPORT_MARGIN, 1)
+
+    # Every zoom level doubles the size
+    zoom = max_zoom
+    if width > 0 or height > 0:
+        scale = min(room_x / width if width > 0 else math.inf,
+                    room_y / height if height > 0 else math.inf)
+        zoom = min(zoom, math.floor(math.log2(scale)))
+
+    map_widget.set_zoom(max(zoom, map_widget.min_zoom))
+    map_widget.set_position(*from_mercator((max(xs) + min(xs)) / 2, (max(ys) + min(ys)) / 2))
+
+
+class MarkerSpec(NamedTuple):
+    """What a marker should look like"""
+    latitude: float
+    longitude: float
+    text: str
+    bucket: int
+    data: Any
+
+
+class MarkerLayer:
+    """Markers on a map keyed by carpark number, updated by difference
+
+    Markers whose key left the result set are removed, new keys get a new
+    marker, and kept markers are only moved, recoloured or retexted if their
+    spec changed, so an update costs time proportional to what changed.
+
+    Examples:
+        ```py
+        layer = MarkerLayer(map_widget, command=marker_click)
+        layer.update({"HE12": MarkerSpec(1.37, 103.85, "HE12", 1, display_text)})
+        ```
+    """
+
+    def __init__(self, map_widget, command: Callable[[Any], None] | None = None):
+        self.map_widget = map_widget
+        self.command = command
+        self.markers: Dict[str, Any] = {}
+        self.specs: Dict[str, MarkerSpec] = {}
+
+    def update(self, specs: Dict[str, MarkerSpec]) -> None:
+        """Makes the markers on the map match the given specs
+
+        Args:
+            specs (Dict[str, MarkerSpec]): Spec of every marker to show, keyed by carpark number
+        """
+
+        # Remove markers that left the result set
+        for key in [key for key in self.markers if key not in specs]:
+            self._remove(key)
+
+        for key, spec in specs.items():
+            old_spec = self.specs.get(key)
+
+            # Add markers that joined the result set
+            if old_spec is None:
+                inner_color, outer_color = BUCKET_COLORS[spec.bucket]
+                self.markers[key] = self.map_widget.set_marker(
+                    spec.latitude, spec.longitude,
+                    text=spec.text,
+                    marker_color_circle=inner_color,
+                    marker_color_outside=outer_color,
+                    data=spec.data,
+                    command=self.command
+                )
+            elif old_spec != spec:
+                self._change(self.markers[key], old_spec, spec)
+
+            self.specs[key] = spec
+
+    def clear(self) -> None:
+        """Removes every marker of the layer"""
+        for key in list(self.markers):
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        """Removes a marker's canvas items, without the full canvas update
+        `CanvasPositionMarker.delete` does for every marker"""
+        marker = self.markers.pop(key)
+        del self.specs[key]
+
+        if marker in self.map_widget.canvas_marker_list:
+            self.map_widget.canvas_marker_list.remove(marker)
+
+        canvas = self.map_widget.canvas
+        for item in (marker.polygon, marker.big_circle, marker.canvas_text,
+                     marker.canvas_image, marker.canvas_icon):
+            if item is not None:
+                canvas.delete(item)
+
+        marker.polygon = marker.big_circle = marker.canvas_text = None
+        marker.canvas_image = marker.canvas_icon = None
+        marker.deleted = True
+
+    def _change(self, marker, old_spec: MarkerSpec, spec: MarkerSpec) -> None:
+        """Applies the differences between two specs to an existing marker"""
+
+        # Recolour if the availability bucket changed
+        if spec.bucket != old_spec.bucket:
+            inner_color, outer_color = BUCKET_COLORS[spec.bucket]
+            marker.marker_color_circle = inner_color
+            marker.marker_color_outside = outer_color
+
+            canvas = self.map_widget.canvas
+            if marker.polygon is not None:
+                canvas.itemconfigure(marker.polygon, fill=outer_color, outline=outer_color)
+            if marker.big_circle is not None:
+                canvas.itemconfigure(marker.big_circle, fill=inner_color, outline=outer_color)
+
+        # Drop the rendered popup if its data changed, it is rendered again on click
+        if spec.data != old_spec.data:
+            marker.data = spec.data
+            if marker.image is not None:
+                marker.image = None
+                marker.image_hidden = True
+
+        # Move or retext, both redraw the marker
+        marker.text = spec.text
+        if (spec.latitude, spec.longitude) != (old_spec.latitude, old_spec.longitude):
+            marker.set_position(spec.latitude, spec.longitude)
+        else:
+            marker.draw()
+
+
+class ClusterLayer:
+    """Carpark markers on a map, with nearby carparks merged into clusters
+    that depend on the zoom level
+
+    Only clusters and markers inside the viewport are drawn. They are
+    recomputed from a quadtree whenever the map is zoomed or panned, and
+    applied through a MarkerLayer, so the map only ever holds a screenful
+    of markers however many carparks are shown. Clicking a cluster zooms in on it.
+
+    Examples:
+        ```py
+        layer = ClusterLayer(map_widget, make_spec=carpark_marker, command=marker_click)
+        layer.show(all_cp_info.rows(all_cp_info.select({"Percentage": (50, None)})))
+        ```
+    """
+
+    def __init__(
+            self,
+            map_widget,
+            make_spec: Callable[[CarparkRow], MarkerSpec],
+            command: Callable[[Any], None] | None = None,
+            on_update: Callable[[Dict[str, MarkerSpec]], None] | None = None
+    ):
+        """
+        Args:
+            map_widget (tk_map.TkinterMapView): The map to draw on
+            make_spec (Callable[[CarparkRow], MarkerSpec]): Makes the marker of a carpark
+            command (Callable[[Any], None] | None): Called when a carpark marker is clicked
+            on_update (Callable[[Dict[str, MarkerSpec]], None] | None): Called with the
+            markers on the map after they change, e.g. to pre-render their popups
+        """
+        self.map_widget = map_widget
+        self.make_spec = make_spec
+        self.command = command
+        self.on_update = on_update
+        self.layer = MarkerLayer(map_widget, command=self._click)
+
+        self.carparks: List[CarparkRow] = []
+        self.tree = QuadTree([], [], [], [])
+        self.viewport: Tuple[int, Bounds] | None = None
+        self.pending = None
+
+        # Recompute the markers whenever the map is dragged or zoomed,
+        # the zoom buttons are canvas items so clicking them counts too
+        for sequence in ("<B1-Motion>", "<ButtonRelease-1>", "<MouseWheel>", "<Button-4>", "<Button-5>"):
+            map_widget.canvas.bind(sequence, self.schedule_refresh, add="+")
+
+    def show(self, carparks: List[CarparkRow]) -> None:
+        """Replaces the carparks shown, carparks without a location are skipped
+
+        Args:
+            carparks (List[CarparkRow]): The carparks to show
+        """
+        self.carparks = [carpark for carpark in carparks if carpark.get("Location") is not None]
+
+        points = [to_mercator(*carpark["Location"]) for carpark in self.carparks]
+        self.tree = QuadTree(
+            [x for x, _ in points],
+            [y for _, y in points],
+            [carpark["Lots Available"] for carpark in self.carparks],
+            [carpark["Total Lots"] for carpark in self.carparks]
+        )
+
+        self.viewport = None
+        self.refresh()
+
+    def current_viewport(self) -> Tuple[int, Bounds]:
+        """Gets the zoom level and bounds of the map, in normalised Web Mercator
+
+        Returns:
+            Tuple[int, Bounds]: The zoom and the bounds, widened by VIEWPORT_MARGIN
+        """
+        zoom = round(self.map_widget.zoom)
+        tiles = 1 << zoom
+        margin = VIEWPORT_MARGIN / self.map_widget.tile_size
+
+        left, top = self.map_widget.upper_left_tile_pos
+        right, bottom = self.map_widget.lower_right_tile_pos
+        return zoom, ((left - margin) / tiles, (top - margin) / tiles,
+                      (right + margin) / tiles, (bottom + margin) / tiles)
+
+    def refresh(self) -> bool:
+        """Redraws the clusters and markers in the viewport, if it changed
+
+        Returns:
+            bool: Whether the viewport changed
+        """
+        viewport = self.current_viewport()
+        if viewport == self.viewport:
+            return False
+        self.viewport = viewport
+
+        zoom, bounds = viewport
+        depth = zoom + CLUSTER_DEPTH_OFFSET if zoom < MAX_CLUSTER_ZOOM else None
+
+        specs = {}
+        for cluster in self.tree.clusters(depth, bounds):
+            # Lone carparks are shown with their own marker
+            if cluster.row is not None:
+                carpark = self.carparks[cluster.row]
+                specs[carpark["Carpark Number"]] = self.make_spec(carpark)
+                continue
+
+            # Clusters are coloured by the share of their lots available
+            percentage = 0.0
+            if cluster.total_lots > 0:
+                percentage = cluster.lots_available / cluster.total_lots * 100
+
+            specs["Cluster {}/{}/{}".format(*cluster.cell)] = MarkerSpec(
+                cluster.latitude, cluster.longitude,
+                "{} carparks, {} lots".format(cluster.count, cluster.lots_available),
+                availability_bucket(percentage),
+                cluster
+            )
+
+        self.layer.update(specs)
+        if self.on_update is not None:
+            self.on_update(specs)
+        return True
+
+    def schedule_refresh(self, event=None) -> None:
+        """Refreshes the markers shortly, at most once every REFRESH_MS"""
+        if self.pending is None:
+            self.pending = self.map_widget.after(REFRESH_MS, self._scheduled_refresh)
+
+    def _scheduled_refresh(self) -> None:
+        self.pending = None
+
+        # The map keeps gliding after a drag, so check again until it stops
+        if self.refresh():
+            self.schedule_refresh()
+
+    def _click(self, marker) -> None:
+        """Zooms in on clicked clusters, and passes clicked carparks on"""
+        if isinstance(marker.data, Cluster):
+            self.map_widget.set_position(marker.data.latitude, marker.data.longitude)
+            self.map_widget.set_zoom(round(self.map_widget.zoom) + CLUSTER_DEPTH_OFFSET)
+            self.refresh()
+        elif self.command is not None:
+            self.command(marker)
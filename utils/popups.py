@@ -0,0 +1,160 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# popups.py
+# Renders the carpark info popups shown when a map marker is clicked,
+# only on demand and cached, so most carparks never get one
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple
+
+from PIL import Image, ImageDraw, ImageFont, ImageTk
+
+from utils.table import CarparkRow
+
+# Popup size in pixels, and the size of its text
+POPUP_SIZE = (300, 75)
+FONT_SIZE = 12
+
+# Fonts tried in order, Arial is missing on most Linux hosts
+FONT_NAMES = ["arial.ttf", "Arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf"]
+
+# Most rendered popups kept in memory
+CACHE_SIZE = 256
+
+# Popups rendered per idle callback when pre-rendering
+PRERENDER_BATCH = 8
+
+
+class PopupInfo(NamedTuple):
+    """What a carpark's popup shows, compared to tell if it needs rendering again"""
+    number: str
+    lots_available: int
+    total_lots: int
+    percentage: float
+    address: str
+
+    @classmethod
+    def from_carpark(cls, carpark: CarparkRow) -> "PopupInfo":
+        return cls(carpark["Carpark Number"], carpark["Lots Available"],
+                   carpark["Total Lots"], carpark["Percentage"], carpark["Address"])
+
+    @property
+    def text(self) -> str:
+        """The popup's text, one line per field"""
+        display_text = ""
+        display_text += self.number + '\n'
+        display_text += "Available Lots: " + str(self.lots_available) + '\n'
+        display_text += "Total Lots: " + str(self.total_lots) + '\n'
+        display_text += "Percentage: " + str(round(self.percentage, 2)) + "%\n"
+        display_text += "Address: " + self.address
+        return display_text
+
+
+@lru_cache(maxsize=None)
+def load_font() -> ImageFont.ImageFont:
+    """Loads the popup font once, falling back to Pillow's built-in font
+
+    Returns:
+        ImageFont.ImageFont: The first of FONT_NAMES found, or the default font
+    """
+    for name in FONT_NAMES:
+        try:
+            return ImageFont.truetype(name, size=FONT_SIZE)
+        except OSError:
+            continue
+
+    # Older Pillow versions only have the default font in one size
+    try:
+        return ImageFont.load_default(size=FONT_SIZE)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def render_popup(info: PopupInfo) -> ImageTk.PhotoImage:
+    """Renders a popup's text into an image
+
+    Args:
+        info (PopupInfo): The carpark to render
+
+    Returns:
+        ImageTk.PhotoImage: The popup, needs a Tk window to exist
+    """
+    # Credits: https://stackoverflow.com/questions/63280719/tkinter-how-to-change-text-into-an-image
+    image = Image.new("RGB", POPUP_SIZE, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.text((0, 0), font=load_font(), text=info.text, fill="black")
+    return ImageTk.PhotoImage(image)
+
+
+class PopupCache:
+    """Least recently used cache of rendered popups
+
+    Popups are keyed by their PopupInfo, so a carpark whose availability changed
+    gets a new popup while unchanged ones are reused. At most `size` popups
+    are kept, markers keep showing evicted popups until they are hidden.
+
+    Examples:
+        ```py
+        popups = PopupCache()
+        marker.image = popups.get(PopupInfo.from_carpark(carpark))
+        ```
+    """
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.images: OrderedDict[PopupInfo, ImageTk.PhotoImage] = OrderedDict()
+        self.queue: List[PopupInfo] = []
+        self.pending = None
+
+    def __contains__(self, info: PopupInfo) -> bool:
+        return info in self.images
+
+    def get(self, info: PopupInfo) -> ImageTk.PhotoImage:
+        """Gets a popup, rendering it if it isn't cached
+
+        Args:
+            info (PopupInfo): The carpark of the popup
+
+        Returns:
+            ImageTk.PhotoImage: The rendered popup
+        """
+        image = self.images.get(info)
+        if image is not None:
+            self.images.move_to_end(info)
+            return image
+
+        image = self.images[info] = render_popup(info)
+        if len(self.images) > self.size:
+            self.images.popitem(last=False)
+
+        return image
+
+    def prerender(self, widget, infos: Iterable[PopupInfo]) -> None:
+        """Renders popups while the window is idle, replacing any earlier request
+
+        Only up to half the cache is pre-rendered, so clicked popups aren't evicted.
+
+        Args:
+            widget (tk.Misc): Any widget of the window, used to schedule the work
+            infos (Iterable[PopupInfo]): The popups to render, e.g. of the visible markers
+        """
+        self.queue = [info for info in infos if info not in self.images][:self.size // 2]
+        self.queue.reverse()
+
+        if self.pending is None and self.queue:
+            self.pending = widget.after_idle(self._prerender_batch, widget)
+
+    def _prerender_batch(self, widget) -> None:
+        """Renders a few queued popups, leaving the rest for the next idle time"""
+        self.pending = None
+
+        for _ in range(min(PRERENDER_BATCH, len(self.queue))):
+            info = self.queue.pop()
+            if info not in self.images:
+                self.get(info)
+
+        # The window may have closed since the work was scheduled
+        if self.queue and widget.winfo_exists():
+            self.pending = widget.after_idle(self._prerender_batch, widget)
@@ -0,0 +1,159 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# scheduler.py
+# Background polling of realtime carpark data, hands new snapshots
+# to the CLI and GUI without blocking them
+
+import threading
+from collections import deque
+from typing import Any, Callable, Tuple
+
+# Seconds between polls, and the longest wait after repeated errors
+POLL_INTERVAL = 60.0
+MAX_BACKOFF = 15 * 60.0
+
+# Snapshots kept until they are taken, older ones are dropped
+MAX_PENDING = 2
+
+
+class Poller:
+    """Calls a fetch function on a daemon thread every `interval` seconds,
+    and keeps the snapshots whose timestamp changed until they are taken
+
+    Snapshots are compared by timestamp before `prepare` runs, so slow work
+    such as linking a snapshot is only done for snapshots that changed.
+
+    Failed fetches (exceptions or None) double the wait before the next poll,
+    up to `max_backoff`. At most `max_pending` snapshots are kept, so memory
+    stays bounded however long the snapshots go untaken.
+
+    Examples:
+        ```py
+        poller = Poller(lambda: get_realtime_info(quiet=True), interval=60,
+                        prepare=lambda timestamp, table: associate_carpark_info(table, carpark_info))
+        poller.start()
+
+        snapshot = poller.take()  # Never blocks
+        if snapshot is not None:
+            timestamp, table = snapshot
+        ```
+    """
+
+    def __init__(
+            self,
+            fetch: Callable[[], Tuple[str, Any] | None],
+            interval: float = POLL_INTERVAL,
+            max_backoff: float = MAX_BACKOFF,
+            max_pending: int = MAX_PENDING,
+            on_snapshot: Callable[[str, Any], None] | None = None,
+            prepare: Callable[[str, Any], Any] | None = None
+    ):
+        """
+        Args:
+            fetch (Callable[[], Tuple[str, Any] | None]): Returns a timestamp and snapshot,
+            None on failure
+            interval (float): Seconds between polls
+            max_backoff (float): Longest wait between polls after errors
+            max_pending (int): Most snapshots kept until taken
+            on_snapshot (Callable[[str, Any], None] | None): Called on the polling thread
+            with every new snapshot as fetched, e.g. to record it
+            prepare (Callable[[str, Any], Any] | None): Called on the polling thread
+            with every new snapshot, its result is kept instead, e.g. to link it
+        """
+        self.fetch = fetch
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.on_snapshot = on_snapshot
+        self.prepare = prepare
+
+        self.pending = deque(maxlen=max_pending)
+        self.last_timestamp = None
+        self.failures = 0
+
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self, immediate: bool = True) -> None:
+        """Starts polling on a daemon thread
+
+        Args:
+            immediate (bool): Whether to poll straight away, or after the first interval
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, args=(immediate,), daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stops polling, an ongoing fetch is left to finish in the background"""
+        self.stopped.set()
+
+    def take(self) -> Tuple[str, Any] | None:
+        """Takes the newest snapshot, dropping any older ones
+
+        Returns:
+            Tuple[str, Any] | None: The timestamp and snapshot, None if there is no new one
+        """
+        with self.lock:
+            if not self.pending:
+                return None
+
+            snapshot = self.pending.pop()
+            self.pending.clear()
+            return snapshot
+
+    def next_delay(self) -> float:
+        """Gets the seconds to wait before the next poll, backing off after errors"""
+        if self.failures == 0:
+            return self.interval
+        return min(self.interval * 2 ** self.failures, self.max_backoff)
+
+    def poll(self) -> bool:
+        """Fetches once and keeps the snapshot if its timestamp changed
+
+        Returns:
+            bool: Whether a new snapshot was kept
+        """
+        try:
+            result = self.fetch()
+        except Exception:
+            result = None
+
+        if result is None:
+            self.failures += 1
+            return False
+
+        self.failures = 0
+        timestamp, snapshot = result
+
+        # Drop snapshots that haven't changed since the last poll
+        if timestamp == self.last_timestamp:
+            return False
+        self.last_timestamp = timestamp
+
+        if self.on_snapshot is not None:
+            self.on_snapshot(timestamp, snapshot)
+
+        if self.prepare is not None:
+            try:
+                snapshot = self.prepare(timestamp, snapshot)
+            except Exception:
+                self.failures += 1
+                return False
+
+        with self.lock:
+            self.pending.append((timestamp, snapshot))
+
+        return True
+
+    def _run(self, immediate: bool) -> None:
+        if not immediate:
+            self.stopped.wait(self.interval)
+
+        while not self.stopped.is_set():
+            self.poll()
+            self.stopped.wait(self.next_delay())
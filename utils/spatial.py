@@ -0,0 +1,425 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# spatial.py
+# Spatial indexes over carpark coordinates, used to cluster and cull
+# markers on the map and find nearby carparks without looking at every carpark
+
+import heapq
+import math
+from array import array
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+# Deepest level of the quadtree, cells there are a few metres wide
+MAX_DEPTH = 24
+
+# Most points kept in a leaf before it is split
+LEAF_SIZE = 8
+
+# Bounds in normalised Web Mercator coordinates: left, top, right, bottom
+Bounds = Tuple[float, float, float, float]
+
+# Mean radius of the earth in kilometres
+EARTH_RADIUS = 6371.0088
+
+
+def to_mercator(latitude: float, longitude: float) -> Tuple[float, float]:
+    """Converts a coordinate to normalised Web Mercator, the projection of map tiles
+
+    Args:
+        latitude (float): Latitude in degrees
+        longitude (float): Longitude in degrees
+
+    Returns:
+        Tuple[float, float]: x and y between 0 and 1, from the top left of the world.
+        Multiplying them by 2 ** zoom gives the map tile position
+    """
+    latitude = math.radians(latitude)
+    x = (longitude + 180.0) / 360.0
+    y = (1.0 - math.asinh(math.tan(latitude)) / math.pi) / 2.0
+    return x, y
+
+
+def from_mercator(x: float, y: float) -> Tuple[float, float]:
+    """Converts normalised Web Mercator back to a coordinate, see `to_mercator`
+
+    Returns:
+        Tuple[float, float]: Latitude and longitude in degrees
+    """
+    latitude = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y))))
+    longitude = x * 360.0 - 180.0
+    return latitude, longitude
+
+
+def to_unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """Converts a coordinate to a point on the unit sphere, where straight line
+    distances order points the same way as distances along the earth
+
+    Args:
+        latitude (float): Latitude in degrees
+        longitude (float): Longitude in degrees
+
+    Returns:
+        Tuple[float, float, float]: x, y and z of the point
+    """
+    latitude = math.radians(latitude)
+    longitude = math.radians(longitude)
+    return (math.cos(latitude) * math.cos(longitude),
+            math.cos(latitude) * math.sin(longitude),
+            math.sin(latitude))
+
+
+def chord_to_km(squared_chord: float) -> float:
+    """Converts a squared straight line distance between unit vectors
+    to kilometres along the earth's surface"""
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+def distance_km(first: Tuple[float, float], second: Tuple[float, float]) -> float:
+    """Gets the distance along the earth's surface between two coordinates
+
+    Args:
+        first (Tuple[float, float]): Latitude and longitude in degrees
+        second (Tuple[float, float]): Latitude and longitude in degrees
+
+    Returns:
+        float: Distance in kilometres
+    """
+    a = to_unit_vector(*first)
+    b = to_unit_vector(*second)
+    return chord_to_km(sum((i - j) ** 2 for i, j in zip(a, b)))
+
+
+class Cluster(NamedTuple):
+    """Carparks grouped into one quadtree cell"""
+    latitude: float
+    longitude: float
+    count: int
+    lots_available: int
+    total_lots: int
+    # Row of the carpark if the cluster holds just one, otherwise None
+    row: int | None
+    # Depth and position of the cell, stable while the map is panned
+    cell: Tuple[int, int, int]
+
+
+class _Node:
+    """Quadtree cell with the totals of every point below it"""
+    __slots__ = ("depth", "cx", "cy", "count", "lots_available", "total_lots",
+                 "sum_x", "sum_y", "children", "rows")
+
+    def __init__(self, depth: int, cx: int, cy: int):
+        self.depth = depth
+        self.cx = cx
+        self.cy = cy
+        self.children: List["_Node"] | None = None
+        self.rows: List[int] | None = None
+
+
+class QuadTree:
+    """Region quadtree over points in normalised Web Mercator coordinates,
+    whose cells line up with map tiles
+
+    Every cell keeps the count, centroid and summed lots of the points below it,
+    so the clusters of a zoom level are read off the cells at one depth, and
+    cells outside the viewport are skipped along with everything below them.
+
+    Examples:
+        ```py
+        tree = QuadTree(xs, ys, lots_available, total_lots)
+
+        # Cells of 64 pixels at zoom 11, inside the viewport
+        clusters = tree.clusters(11 + 2, viewport)
+        ```
+    """
+
+    def __init__(
+            self,
+            xs: Sequence[float],
+            ys: Sequence[float],
+            lots_available: Sequence[int],
+            total_lots: Sequence[int],
+            rows: Sequence[int] | None = None
+    ):
+        """
+        Args:
+            xs (Sequence[float]): x of every point, see `to_mercator`
+            ys (Sequence[float]): y of every point
+            lots_available (Sequence[int]): Lots Available of every point
+            total_lots (Sequence[int]): Total Lots of every point
+            rows (Sequence[int] | None): Row of every point reported in clusters,
+            None to use the point's position
+        """
+        self.xs = array("d", xs)
+        self.ys = array("d", ys)
+        self.lots_available = array("i", lots_available)
+        self.total_lots = array("i", total_lots)
+        self.rows = array("i", range(len(self.xs)) if rows is None else rows)
+
+        # Cell position of every point at the deepest level
+        scale = 1 << MAX_DEPTH
+        self.cxs = array("q", (min(max(int(x * scale), 0), scale - 1) for x in self.xs))
+        self.cys = array("q", (min(max(int(y * scale), 0), scale - 1) for y in self.ys))
+
+        self.root = self._build(list(range(len(self.xs))), 0, 0, 0)
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def _build(self, points: List[int], depth: int, cx: int, cy: int) -> _Node:
+        """Builds the cell at the given depth and position holding the given points"""
+        node = _Node(depth, cx, cy)
+
+        if len(points) <= LEAF_SIZE or depth == MAX_DEPTH:
+            node.rows = points
+            self._sum(node, points)
+            return node
+
+        # Split the points between the four child cells, using the bits
+        # of their cell position at the deepest level
+        shift = MAX_DEPTH - depth - 1
+        quadrants: List[List[int]] = [[], [], [], []]
+        for point in points:
+            quadrants[(self.cys[point] >> shift & 1) * 2 + (self.cxs[point] >> shift & 1)].append(point)
+
+        node.children = [
+            self._build(quadrant, depth + 1, 2 * cx + i % 2, 2 * cy + i // 2)
+            for i, quadrant in enumerate(quadrants) if quadrant
+        ]
+
+        # Totals of a cell are the totals of its children
+        node.count = sum(child.count for child in node.children)
+        node.lots_available = sum(child.lots_available for child in node.children)
+        node.total_lots = sum(child.total_lots for child in node.children)
+        node.sum_x = sum(child.sum_x for child in node.children)
+        node.sum_y = sum(child.sum_y for child in node.children)
+        return node
+
+    def _sum(self, node: _Node, points: List[int]) -> None:
+        """Sets a cell's totals from the points below it"""
+        node.count = len(points)
+        node.lots_available = sum(self.lots_available[point] for point in points)
+        node.total_lots = sum(self.total_lots[point] for point in points)
+        node.sum_x = sum(self.xs[point] for point in points)
+        node.sum_y = sum(self.ys[point] for point in points)
+
+    def _cluster(self, node: _Node) -> Cluster:
+        """Summarises a cell as a cluster at its centroid"""
+        latitude, longitude = from_mercator(node.sum_x / node.count, node.sum_y / node.count)
+        row = self.rows[node.rows[0]] if node.count == 1 else None
+        return Cluster(latitude, longitude, node.count, node.lots_available,
+                       node.total_lots, row, (node.depth, node.cx, node.cy))
+
+    @staticmethod
+    def _intersects(depth: int, cx: int, cy: int, bounds: Bounds | None) -> bool:
+        """Checks whether a cell overlaps the bounds"""
+        if bounds is None:
+            return True
+
+        size = 1.0 / (1 << depth)
+        left, top, right, bottom = bounds
+        return (cx * size <= right and (cx + 1) * size >= left
+                and cy * size <= bottom and (cy + 1) * size >= top)
+
+    def clusters(self, depth: int | None, bounds: Bounds | None = None) -> List[Cluster]:
+        """Groups the points into the cells at a depth, skipping cells outside the bounds
+
+        At zoom z a cell at depth z + 8 is one 256 pixel tile wide, so every
+        depth further halves the size of the clusters on screen.
+
+        Args:
+            depth (int | None): Depth of the cells to group by, None to not group
+            bounds (Bounds | None): Area to include, None for the whole world
+
+        Returns:
+            List[Cluster]: Every non-empty cell inside the bounds
+        """
+        clusters = []
+        if len(self) == 0:
+            return clusters
+
+        if depth is not None:
+            depth = min(depth, MAX_DEPTH)
+
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if not self._intersects(node.depth, node.cx, node.cy, bounds):
+                continue
+
+            if depth is not None and node.depth == depth:
+                clusters.append(self._cluster(node))
+            elif node.children is not None:
+                stack.extend(node.children)
+            else:
+                clusters.extend(self._split_leaf(node, depth, bounds))
+
+        return clusters
+
+    def _split_leaf(self, node: _Node, depth: int | None, bounds: Bounds | None) -> List[Cluster]:
+        """Groups the points of a leaf shallower than the requested depth"""
+
+        # Without grouping, every point is its own cluster
+        if depth is None:
+            groups = [((MAX_DEPTH, self.cxs[point], self.cys[point]), [point]) for point in node.rows]
+        else:
+            shift = MAX_DEPTH - depth
+            cells: Dict[Tuple[int, int, int], List[int]] = {}
+            for point in node.rows:
+                cell = (depth, self.cxs[point] >> shift, self.cys[point] >> shift)
+                cells.setdefault(cell, []).append(point)
+            groups = cells.items()
+
+        clusters = []
+        for (cell_depth, cx, cy), points in groups:
+            if not self._intersects(cell_depth, cx, cy, bounds):
+                continue
+
+            cell = _Node(cell_depth, cx, cy)
+            self._sum(cell, points)
+            cell.rows = points
+            clusters.append(self._cluster(cell))
+
+        return clusters
+
+
+class KDTree:
+    """Balanced k-d tree over coordinates, for nearest neighbour queries
+
+    Coordinates are stored as points on the unit sphere, so distances are
+    exact anywhere on earth. The tree is implicit: `order` holds the points
+    sorted so that every subtree is a slice whose middle element is its root.
+    Each subtree also keeps the lowest and highest value of some numeric
+    columns, so subtrees that cannot match a range query are skipped whole.
+
+    Examples:
+        ```py
+        tree = KDTree(table.column("Location"), {"Percentage": table.column("Percentage")})
+
+        # 5 nearest carparks at least 50% available, with their distance in km
+        tree.nearest(1.3521, 103.8198, 5, {"Percentage": (50, None)})
+        ```
+    """
+
+    def __init__(
+            self,
+            locations: Sequence[Tuple[float, float] | None],
+            columns: Dict[str, Sequence[float]] | None = None
+    ):
+        """
+        Args:
+            locations (Sequence[Tuple[float, float] | None]): Latitude and longitude
+            of every row, rows without a location are left out
+            columns (Dict[str, Sequence[float]] | None): Numeric columns that
+            queries can filter on, keyed by name
+        """
+        self.columns = columns or {}
+
+        # Unit vector of every located row
+        self.coords = (array("d"), array("d"), array("d"))
+        rows = []
+        for row, location in enumerate(locations):
+            if location is None:
+                continue
+            for axis, value in zip(self.coords, to_unit_vector(*location)):
+                axis.append(value)
+            rows.append(row)
+
+        self.rows = array("i", rows)
+        self.order = array("i", range(len(rows)))
+
+        # Lowest and highest value of each column in every subtree, by subtree root
+        self.lows = {name: array("d", bytes(8 * len(rows))) for name in self.columns}
+        self.highs = {name: array("d", bytes(8 * len(rows))) for name in self.columns}
+
+        self._build(0, len(rows), 0)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _build(self, lo: int, hi: int, depth: int) -> None:
+        """Sorts the slice lo:hi into a subtree split on the axis of its depth"""
+        if lo >= hi:
+            return
+
+        axis = self.coords[depth % 3]
+        self.order[lo:hi] = array("i", sorted(self.order[lo:hi], key=axis.__getitem__))
+
+        mid = (lo + hi) // 2
+        self._build(lo, mid, depth + 1)
+        self._build(mid + 1, hi, depth + 1)
+
+        # Combine the column bounds of the root and both children
+        row = self.rows[self.order[mid]]
+        children = [(lo + mid) // 2] if lo < mid else []
+        if mid + 1 < hi:
+            children.append((mid + 1 + hi) // 2)
+
+        for name, column in self.columns.items():
+            lows, highs = self.lows[name], self.highs[name]
+            lows[mid] = min([column[row]] + [lows[child] for child in children])
+            highs[mid] = max([column[row]] + [highs[child] for child in children])
+
+    def nearest(
+            self,
+            latitude: float,
+            longitude: float,
+            k: int = 1,
+            ranges: Dict[str, Tuple[float | None, float | None]] | None = None
+    ) -> List[Tuple[int, float]]:
+        """Finds the k nearest rows whose values are within every given range
+
+        Args:
+            latitude (float): Latitude of the point to search from
+            longitude (float): Longitude of the point to search from
+            k (int): Number of rows to return
+            ranges (Dict[str, Tuple[float | None, float | None]] | None): Inclusive
+            (low, high) bounds keyed by column name, only columns given to the tree
+
+        Returns:
+            List[Tuple[int, float]]: Row and distance in kilometres, nearest first
+        """
+        checks = [(name, low, high) for name, (low, high) in (ranges or {}).items()]
+        query = to_unit_vector(latitude, longitude)
+        xs, ys, zs = self.coords
+
+        # Max-heap of the best rows so far, as (-squared distance, -row)
+        best: List[Tuple[float, int]] = []
+
+        def search(lo: int, hi: int, depth: int) -> None:
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+
+            # Skip subtrees without any value in range
+            for name, low, high in checks:
+                if ((low is not None and self.highs[name][mid] < low)
+                        or (high is not None and self.lows[name][mid] > high)):
+                    return
+
+            # Consider the subtree's root
+            point = self.order[mid]
+            row = self.rows[point]
+            distance = ((query[0] - xs[point]) ** 2 + (query[1] - ys[point]) ** 2
+                        + (query[2] - zs[point]) ** 2)
+            if len(best) < k or distance < -best[0][0]:
+                if all((low is None or self.columns[name][row] >= low)
+                       and (high is None or self.columns[name][row] <= high)
+                       for name, low, high in checks):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, -row))
+                    else:
+                        heapq.heapreplace(best, (-distance, -row))
+
+            # Search the side of the split holding the query first, and the
+            # other side only if it could hold something nearer
+            offset = query[depth % 3] - self.coords[depth % 3][point]
+            near, far = ((lo, mid), (mid + 1, hi)) if offset < 0 else ((mid + 1, hi), (lo, mid))
+            search(*near, depth + 1)
+            if len(best) < k or offset * offset < -best[0][0]:
+                search(*far, depth + 1)
+
+        if k > 0:
+            search(0, len(self), 0)
+
+        return [(-row, chord_to_km(-distance)) for distance, row in sorted(best, reverse=True)]
@@ -0,0 +1,418 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# table.py
+# Columnar storage for carpark data, keeps every column once in a typed array
+# and provides a row view so rows can still be read like dictionaries
+
+import heapq
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from utils.indexes import SortedIndex, TrigramIndex
+from utils.spatial import KDTree, distance_km
+
+# Columns stored as typed arrays instead of lists of strings
+INT_COLUMNS = ("Total Lots", "Lots Available")
+FLOAT_COLUMNS = ("Percentage",)
+BYTE_COLUMNS = ("Availability Bucket",)
+
+
+def _new_column(name: str) -> array | List[Any]:
+    """Creates an empty column with the storage type matching its name
+
+    Args:
+        name (str): Name of the column
+
+    Returns:
+        array | List[Any]: An int array, a float array, a byte array for
+        small numbers or a list for text
+    """
+    if name in INT_COLUMNS:
+        return array("i")
+    if name in FLOAT_COLUMNS:
+        return array("d")
+    if name in BYTE_COLUMNS:
+        return array("b")
+    return []
+
+
+class CarparkRow(Mapping):
+    """Read-only view of a single row in a CarparkTable,
+    behaves like the Dict[str, str] rows used previously"""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "CarparkTable", index: int):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key: str) -> Any:
+        return self.table.columns[key][self.index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.table.columns)
+
+    def __len__(self) -> int:
+        return len(self.table.columns)
+
+    def __repr__(self) -> str:
+        return "CarparkRow({})".format(dict(self))
+
+
+class CarparkTable:
+    """Carpark data stored column by column
+
+    Lot counts are kept in int arrays, the percentage in a float array,
+    and text columns in lists of interned strings.
+
+    Examples:
+        ```py
+        table = CarparkTable(["Carpark Number", "Total Lots", "Lots Available"])
+        table.append({"Carpark Number": "HE12", "Total Lots": "105", "Lots Available": "41"})
+
+        table[0]["Total Lots"]  # 105
+        table.column("Lots Available")  # array('i', [41])
+        ```
+    """
+
+    def __init__(self, headers: Iterable[str]):
+        self.columns: Dict[str, array | List[Any]] = {}
+        for header in headers:
+            self.columns[header] = _new_column(header)
+
+        # Indexes over columns, cleared when their column changes
+        self.keyed_indexes: Dict[str, Dict[Any, int]] = {}
+        self.text_indexes: Dict[str, TrigramIndex] = {}
+        self.sorted_indexes: Dict[str, SortedIndex] = {}
+        self.spatial_indexes: Dict[str, KDTree] = {}
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Iterable[Any]]) -> "CarparkTable":
+        """Builds a table from already parsed columns
+
+        Args:
+            columns (Dict[str, Iterable[Any]]): The values of each column, keyed by header
+
+        Returns:
+            CarparkTable: The table containing the columns
+        """
+        table = cls([])
+        for name, values in columns.items():
+            column = _new_column(name)
+            column.extend(values)
+            table.columns[name] = column
+
+        return table
+
+    def to_columns(self) -> Dict[str, array | List[Any]]:
+        """Returns every column keyed by header, the reverse of `from_columns`
+
+        Returns:
+            Dict[str, array | List[Any]]: The columns of the table
+        """
+        return dict(self.columns)
+
+    @property
+    def headers(self) -> List[str]:
+        return list(self.columns)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Appends a row, converting each value to its column's type
+
+        Args:
+            record (Dict[str, Any]): The row to append, keyed by header
+        """
+        self.keyed_indexes.clear()
+        self.text_indexes.clear()
+        self.sorted_indexes.clear()
+        self.spatial_indexes.clear()
+
+        for header, column in self.columns.items():
+            value = record.get(header)
+
+            if header in INT_COLUMNS:
+                column.append(int(value))
+            elif header in FLOAT_COLUMNS:
+                column.append(float(value))
+            elif isinstance(value, str):
+                column.append(sys.intern(value))
+            else:
+                column.append(value)
+
+    def add_column(self, name: str, values: Iterable[Any]) -> None:
+        """Adds a derived column to the table, replacing it if it already exists
+
+        Args:
+            name (str): Name of the column
+            values (Iterable[Any]): The values, one per row
+        """
+        column = _new_column(name)
+        column.extend(values)
+
+        if len(column) != len(self):
+            raise ValueError("Column '{}' has {} values, expected {}"
+                             .format(name, len(column), len(self)))
+
+        self.columns[name] = column
+        self.keyed_indexes.pop(name, None)
+        self.text_indexes.pop(name, None)
+        self.sorted_indexes.pop(name, None)
+
+        # Spatial indexes also hold the bounds of the columns they filter on
+        for key, index in list(self.spatial_indexes.items()):
+            if key == name or name in index.columns:
+                del self.spatial_indexes[key]
+
+    def index_by(self, name: str) -> Dict[Any, int]:
+        """Returns a lookup from each value of a column to its row index,
+        the lookup is built once and reused until the column changes
+
+        Args:
+            name (str): Name of the column to key by, e.g. "Carpark Number"
+
+        Returns:
+            Dict[Any, int]: Row index keyed by the column value
+        """
+        index = self.keyed_indexes.get(name)
+        if index is None:
+            index = {value: i for i, value in enumerate(self.columns[name])}
+            self.keyed_indexes[name] = index
+
+        return index
+
+    def build_text_index(self, name: str) -> None:
+        """Builds a trigram index over a text column for `search`
+
+        Args:
+            name (str): Name of the text column, e.g. "Address"
+        """
+        self.text_indexes[name] = TrigramIndex(self.columns[name])
+
+    def search(self, name: str, query: str) -> List[int]:
+        """Finds the rows where a text column contains the query, through
+        the column's trigram index, built on the first search of the column
+
+        Args:
+            name (str): Name of the text column
+            query (str): The substring to search for
+
+        Returns:
+            List[int]: Indices of the matching rows, in ascending order
+        """
+        index = self.text_indexes.get(name)
+        if index is None:
+            self.build_text_index(name)
+            index = self.text_indexes[name]
+
+        return index.search(query)
+
+    def build_sorted_index(self, name: str) -> None:
+        """Builds a sorted index over a numeric column for `select`
+
+        Args:
+            name (str): Name of the numeric column, e.g. "Percentage"
+        """
+        self.sorted_indexes[name] = SortedIndex(self.columns[name])
+
+    def select(
+            self,
+            ranges: Dict[str, Tuple[float | None, float | None]],
+            rows: Iterable[int] | None = None
+    ) -> List[int]:
+        """Finds the rows whose values are within every given range
+
+        The narrowest range with a sorted index is answered by binary search,
+        the remaining ranges are then checked against the matching rows only.
+
+        Examples:
+            ```py
+            # Carparks between 25% and 75% available, with at least 10 free lots
+            table.select({"Percentage": (25, 75), "Lots Available": (10, None)})
+            ```
+
+        Args:
+            ranges (Dict[str, Tuple[float | None, float | None]]): Inclusive (low, high)
+            bounds keyed by column name, None for an open bound
+            rows (Iterable[int] | None): Only consider these rows, e.g. the result of `search`
+
+        Returns:
+            List[int]: Indices of the matching rows, in ascending order
+        """
+        checks = list(ranges.items())
+
+        # Start from the indexed range matching the fewest rows
+        indexed = [(self.sorted_indexes[name].count(*bounds), name, bounds)
+                   for name, bounds in checks if name in self.sorted_indexes]
+        if indexed:
+            _, name, bounds = min(indexed)
+            candidates = self.sorted_indexes[name].between(*bounds)
+            checks.remove((name, bounds))
+        else:
+            candidates = range(len(self))
+
+        # Restrict to the given rows
+        if rows is not None:
+            rows = set(rows)
+            candidates = [i for i in candidates if i in rows]
+
+        # Check the remaining ranges
+        for name, (low, high) in checks:
+            column = self.columns[name]
+            candidates = [i for i in candidates
+                          if (low is None or column[i] >= low)
+                          and (high is None or column[i] <= high)]
+
+        return sorted(candidates)
+
+    def top(
+            self,
+            name: str,
+            k: int = 1,
+            largest: bool = True,
+            ranges: Dict[str, Tuple[float | None, float | None]] | None = None,
+            where: Callable[[int], bool] | None = None
+    ) -> List[int]:
+        """Ranks the rows by a numeric column and returns the first k
+
+        Uses the column's sorted index if one has been built, so only the rows
+        up to the k-th match are visited. Rows with equal values keep their row order.
+
+        Examples:
+            ```py
+            # 10 emptiest carparks with a known location
+            table.top("Percentage", 10, where=lambda i: table.column("Location")[i] is not None)
+            ```
+
+        Args:
+            name (str): Name of the numeric column to rank by
+            k (int): Number of rows to return
+            largest (bool): Whether to rank from the highest value, or the lowest
+            ranges (Dict[str, Tuple[float | None, float | None]] | None): Inclusive
+            (low, high) bounds the rows must be within, keyed by column name
+            where (Callable[[int], bool] | None): Extra condition on the row index
+
+        Returns:
+            List[int]: Indices of the ranked rows, best first
+        """
+        checks = list((ranges or {}).items())
+
+        def matches(i: int) -> bool:
+            for check_name, (low, high) in checks:
+                value = self.columns[check_name][i]
+                if (low is not None and value < low) or (high is not None and value > high):
+                    return False
+            return where is None or where(i)
+
+        # Walk the sorted index until k rows match
+        index = self.sorted_indexes.get(name)
+        if index is not None:
+            ranked = []
+            for i in index.descending() if largest else index.ascending():
+                if len(ranked) >= k:
+                    break
+                if matches(i):
+                    ranked.append(i)
+            return ranked
+
+        # Fall back to a heap over the matching rows
+        column = self.columns[name]
+        candidates = (i for i in range(len(self)) if matches(i))
+        if largest:
+            return heapq.nsmallest(k, candidates, key=lambda i: (-column[i], i))
+        return heapq.nsmallest(k, candidates, key=lambda i: (column[i], i))
+
+    def build_spatial_index(self, name: str, filters: Iterable[str] = ()) -> None:
+        """Builds a k-d tree over a location column for `nearest`
+
+        Args:
+            name (str): Name of the location column, e.g. "Location"
+            filters (Iterable[str]): Numeric columns `nearest` can filter on
+            while searching, e.g. "Percentage"
+        """
+        self.spatial_indexes[name] = KDTree(
+            self.columns[name], {column: self.columns[column] for column in filters})
+
+    def nearest(
+            self,
+            name: str,
+            latitude: float,
+            longitude: float,
+            k: int = 1,
+            ranges: Dict[str, Tuple[float | None, float | None]] | None = None
+    ) -> List[Tuple[int, float]]:
+        """Finds the k rows nearest to a point whose values are within every given range,
+        rows without a location are skipped
+
+        Uses the column's k-d tree if one has been built with every filtered
+        column, otherwise every row is checked.
+
+        Examples:
+            ```py
+            # 5 nearest carparks with at least 50% and 10 lots available
+            table.nearest("Location", 1.3521, 103.8198, 5,
+                          {"Percentage": (50, None), "Lots Available": (10, None)})
+            ```
+
+        Args:
+            name (str): Name of the location column, holding (latitude, longitude) or None
+            latitude (float): Latitude of the point to search from
+            longitude (float): Longitude of the point to search from
+            k (int): Number of rows to return
+            ranges (Dict[str, Tuple[float | None, float | None]] | None): Inclusive
+            (low, high) bounds the rows must be within, keyed by column name
+
+        Returns:
+            List[Tuple[int, float]]: Row index and distance in kilometres, nearest first
+        """
+        ranges = ranges or {}
+
+        index = self.spatial_indexes.get(name)
+        if index is not None and all(column in index.columns for column in ranges):
+            return index.nearest(latitude, longitude, k, ranges)
+
+        # Fall back to a heap over the matching rows
+        candidates = (i for i in self.select(ranges) if self.columns[name][i] is not None)
+        distances = ((distance_km((latitude, longitude), self.columns[name][i]), i)
+                     for i in candidates)
+        return [(i, distance) for distance, i in heapq.nsmallest(k, distances)]
+
+    def column(self, name: str) -> array | List[Any]:
+        """Returns the underlying storage of a column
+
+        Args:
+            name (str): Name of the column
+
+        Returns:
+            array | List[Any]: The column's values
+        """
+        return self.columns[name]
+
+    def rows(self, indices: Iterable[int]) -> List[CarparkRow]:
+        """Returns row views for the given row indices
+
+        Args:
+            indices (Iterable[int]): The indices of the rows
+
+        Returns:
+            List[CarparkRow]: The rows, in the order of `indices`
+        """
+        return [CarparkRow(self, i) for i in indices]
+
+    def __len__(self) -> int:
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def __getitem__(self, index: int) -> CarparkRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CarparkTable index out of range")
+        return CarparkRow(self, index)
+
+    def __iter__(self) -> Iterator[CarparkRow]:
+        for i in range(len(self)):
+            yield CarparkRow(self, i)
@@ -0,0 +1,131 @@
+# Name: Hu Bowen (S10255800B)
+# Date: 18 Oct 2026
+#
+# vectorized.py
+# Joins availability with the carpark information and computes the derived
+# columns a whole column at a time, using NumPy when it is installed
+
+from array import array
+from functools import lru_cache
+from itertools import chain, repeat
+from typing import Any, Dict, List, Sequence
+
+# Percentages above which a carpark moves up an availability bucket
+BUCKET_THRESHOLDS = (25, 75)
+
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    """Imports NumPy on first use, so it doesn't slow down starting the program
+
+    Returns:
+        module | None: The numpy module, None if it isn't installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _engine(vectorize: bool | None):
+    """Gets numpy if it should be used, None for the pure Python fallback"""
+    if vectorize is False:
+        return None
+
+    np = load_numpy()
+    if np is None and vectorize:
+        raise ImportError("NumPy is needed to vectorize, run `pip install numpy`")
+    return np
+
+
+def join_rows(keys: Sequence[str], index: Dict[str, int], vectorize: bool | None = None) -> Sequence[int]:
+    """Looks up the row of every key once, so columns can be joined by row number
+
+    Args:
+        keys (Sequence[str]): The keys to join, e.g. the carpark numbers of a snapshot
+        index (Dict[str, int]): Row of each key in the other table, see `CarparkTable.index_by`
+        vectorize (bool | None): Whether to use NumPy, None to use it if it is installed
+
+    Returns:
+        Sequence[int]: Row of every key, -1 for keys not in the index
+    """
+    np = _engine(vectorize)
+    rows = map(index.get, keys, repeat(-1))
+    if np is None:
+        return array("q", rows)
+    return np.fromiter(rows, dtype=np.intp, count=len(keys))
+
+
+def take(column: Sequence[Any], rows: Sequence[int], missing: Any = None, vectorize: bool | None = None) -> List[Any]:
+    """Gathers the values of a column at the given rows
+
+    Args:
+        column (Sequence[Any]): The column to read from
+        rows (Sequence[int]): Rows to read, made by `join_rows`
+        missing (Any): Value given for the rows that are -1
+        vectorize (bool | None): Whether to use NumPy, None to use it if it is installed
+
+    Returns:
+        List[Any]: The value of every row
+    """
+    np = _engine(vectorize)
+
+    # The missing value is appended, so row -1 reads it
+    if np is None:
+        values = list(column)
+        values.append(missing)
+        return [values[row] for row in rows]
+
+    values = np.fromiter(chain(column, [missing]), dtype=object, count=len(column) + 1)
+    return values.take(np.asarray(rows, dtype=np.intp)).tolist()
+
+
+def percentages(lots_available: array, total_lots: array, vectorize: bool | None = None) -> array:
+    """Computes the percentage of lots available, 0 for carparks without lots
+
+    Args:
+        lots_available (array): Lots Available of every carpark, an int array
+        total_lots (array): Total Lots of every carpark, an int array
+        vectorize (bool | None): Whether to use NumPy, None to use it if it is installed
+
+    Returns:
+        array: The percentage of every carpark, a float array
+    """
+    np = _engine(vectorize)
+    if np is None:
+        return array("d", ((available / total) * 100 if total != 0 else 0.0
+                           for available, total in zip(lots_available, total_lots)))
+
+    # Divide only where there are lots, the rest keep their 0
+    available = np.asarray(lots_available, dtype=np.float64)
+    total = np.asarray(total_lots, dtype=np.float64)
+    result = np.zeros(len(available))
+    np.divide(available, total, out=result, where=total != 0)
+    result *= 100
+
+    values = array("d")
+    values.frombytes(result.tobytes())
+    return values
+
+
+def availability_buckets(percentages: array, vectorize: bool | None = None) -> array:
+    """Computes the availability bucket of every carpark, see `availability_bucket`
+
+    Args:
+        percentages (array): Percentage of lots available of every carpark
+        vectorize (bool | None): Whether to use NumPy, None to use it if it is installed
+
+    Returns:
+        array: The bucket of every carpark, a byte array of indexes into BUCKET_COLORS
+    """
+    np = _engine(vectorize)
+    low, high = BUCKET_THRESHOLDS
+    if np is None:
+        return array("b", ((percentage > low) + (percentage > high) for percentage in percentages))
+
+    values = np.asarray(percentages, dtype=np.float64)
+    buckets = (values > low).astype(np.int8) + (values > high)
+    result = array("b")
+    result.frombytes(buckets.astype(np.int8).tobytes())
+    return result